@@ -0,0 +1,360 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class CycleScheduler:
+    """
+    Планировщик циклов опроса на абсолютной временной сетке.
+    Моменты запуска циклов отсчитываются от начала работы (origin + n * period),
+    поэтому задержки отдельных циклов не накапливаются. Если цикл опоздал больше чем
+    на период, пропущенные такты не догоняются, а учитываются в статистике
+    """
+    def __init__(self, period: float, clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time):
+        self.period = period        # период опроса, с
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._stop_event = threading.Event()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Сбрасывает временную сетку и статистику, первый такт наступает немедленно
+        """
+        self._origin = self._clock()
+        self._wall_origin = self._wall_clock()
+        self._tick = -1
+        self.cycles = 0             # количество выполненных тактов
+        self.missed = 0             # количество пропущенных тактов
+        self.lateness = 0.0         # опоздание последнего такта, с
+        self._lateness_sum = 0.0
+        self._lateness_sq_sum = 0.0
+        self._lateness_max = 0.0
+
+    @property
+    def tick(self) -> int:
+        """
+        Номер текущего такта на сетке
+        """
+        return self._tick
+
+    @property
+    def tick_time(self) -> float:
+        """
+        Плановое время текущего такта (по часам планировщика)
+        """
+        return self._origin + self._tick * self.period
+
+    @property
+    def tick_timestamp(self) -> float:
+        """
+        Плановое время текущего такта по системным часам (Unix time, с).
+        Отсчитывается от начала сетки, поэтому записи следуют ровно через период независимо от задержек обмена с приборами
+        """
+        return self._wall_origin + self._tick * self.period
+
+    @property
+    def stats(self) -> dict:
+        """
+        Статистика работы планировщика: число тактов, пропуски, среднее и максимальное опоздание
+        и джиттер (среднеквадратичное отклонение опоздания), с
+        """
+        mean = self._lateness_sum / self.cycles if self.cycles else 0.0
+        variance = self._lateness_sq_sum / self.cycles - mean ** 2 if self.cycles else 0.0
+        return {
+            "cycles": self.cycles,
+            "missed": self.missed,
+            "lateness": self.lateness,
+            "lateness_mean": mean,
+            "lateness_max": self._lateness_max,
+            "jitter": math.sqrt(max(variance, 0.0))
+        }
+
+    def wait_next(self) -> bool:
+        """
+        Ожидает наступления следующего такта сетки
+
+        Returns:
+            bool: False, если планировщик был остановлен во время ожидания
+        """
+        if self._stop_event.is_set():
+            return False
+        self._tick += 1
+        now = self._clock()
+        behind = int((now - self.tick_time) // self.period)
+        if behind > 0:
+            # Цикл переполнен: пропускаем такты, на которые опоздали целиком
+            self._tick += behind
+            self.missed += behind
+        delay = self.tick_time - now
+        if delay > 0 and self._stop_event.wait(delay):
+            return False
+
+        self.lateness = max(self._clock() - self.tick_time, 0.0)
+        self.cycles += 1
+        self._lateness_sum += self.lateness
+        self._lateness_sq_sum += self.lateness ** 2
+        self._lateness_max = max(self._lateness_max, self.lateness)
+        return True
+
+    def stop(self) -> None:
+        """
+        Прерывает ожидание и останавливает планировщик
+        """
+        self._stop_event.set()
+
+    @property
+    def isRunning(self) -> bool:
+        return not self._stop_event.is_set()
+
+
+class CircuitBreaker:
+    """
+    Состояние работоспособности прибора в цикле опроса.
+    healthy  - прибор отвечает;
+    degraded - последние опросы завершились ошибкой, но прибор ещё опрашивается каждый такт;
+    open     - после failure_threshold ошибок подряд прибор исключается из опроса и лишь изредка
+               проверяется пробным опросом; интервал между пробами удваивается после каждой неудачи
+               (от backoff_initial до backoff_max), а первый успешный опрос возвращает прибор в работу
+    """
+    HEALTHY = "healthy"
+    DEGRADED = "degraded"
+    OPEN = "open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, backoff_initial: float = 1.0, backoff_max: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.backoff_initial = backoff_initial  # интервал до первой пробы, с
+        self.backoff_max = backoff_max          # наибольший интервал между пробами, с
+        self._clock = clock
+        self.state = self.HEALTHY
+        self.failures = 0           # количество ошибок подряд
+        self.backoff = backoff_initial
+        self.next_probe = 0.0       # время следующей пробы (по часам clock)
+
+    @property
+    def isOpen(self) -> bool:
+        return self.state == self.OPEN
+
+    def allow(self) -> bool:
+        """
+        Проверяет, нужно ли опрашивать прибор: всегда, пока цепь не разомкнута, иначе - когда наступило время пробы
+        """
+        return self.state != self.OPEN or self._clock() >= self.next_probe
+
+    def record(self, ok: bool) -> None:
+        """
+        Учитывает результат опроса
+        """
+        if ok:
+            if self.state == self.OPEN:
+                print(f"(+) Reader: {self.name} is responding again, polling resumed")
+            self.state = self.HEALTHY
+            self.failures = 0
+            self.backoff = self.backoff_initial
+            return
+
+        self.failures += 1
+        if self.state == self.OPEN:
+            # проба не удалась
+            self.backoff = min(self.backoff * 2, self.backoff_max)
+        elif self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.backoff = self.backoff_initial
+            print(f"(!) Reader: {self.name} is not responding, polling suspended")
+        else:
+            self.state = self.DEGRADED
+        if self.state == self.OPEN:
+            self.next_probe = self._clock() + self.backoff
+
+
+class CommandQueue:
+    """
+    Очередь команд управления прибором, выполняемых потоком опроса.
+    Повторные команды для одного параметра объединяются: в очереди остаётся только последнее значение,
+    которое переносится в конец очереди, поэтому команды выполняются в порядке их последней постановки
+    (уставка, изменение режима, новая уставка - режим изменяется до новой уставки)
+    """
+    def __init__(self):
+        self._commands: OrderedDict[str, tuple[Callable, tuple]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.coalesced = 0          # количество команд, заменённых более новыми
+
+    def put(self, parameter: str, func: Callable, *args) -> None:
+        """
+        Ставит команду в конец очереди, удаляя ещё не выполненную команду для того же параметра
+
+        Parameters:
+            parameter (str): название параметра (voltage, current, output, ...)
+            func (Callable): метод прибора, выполняющий команду
+            args: аргументы метода
+        """
+        with self._lock:
+            if parameter in self._commands:
+                self.coalesced += 1
+                del self._commands[parameter]
+            self._commands[parameter] = (func, args)
+
+    def take(self) -> list[tuple[str, Callable, tuple]]:
+        """
+        Извлекает все накопленные команды в порядке постановки
+        """
+        with self._lock:
+            commands = [(parameter, func, args) for parameter, (func, args) in self._commands.items()]
+            self._commands.clear()
+        return commands
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._commands)
+
+
+class PollGroup:
+    """
+    Группа каналов, опрашиваемая через общий канал связи с собственным периодом.
+    Период задаётся в тактах базовой сетки планировщика. Последние прочитанные значения сохраняются
+    для отображения всех каналов, а новые значения выдаются take_fresh() один раз,
+    чтобы в хранилище попадали только действительно выполненные опросы
+    """
+    def __init__(self, name: str, read: Callable[[], dict], period_ticks: int = 1,
+                 check: Callable[[], bool] | None = None, health: CircuitBreaker | None = None):
+        self.name = name
+        self.read = read
+        self.check = check          # проверка успешности последнего опроса (по флагам last_read_ok приборов)
+        self.period_ticks = max(int(period_ticks), 1)
+        self.values = {}            # последние прочитанные значения
+        self.future = None          # незавершённый опрос в параллельном режиме
+        self.commands = CommandQueue()  # команды управления приборами группы
+        self.health = health if health is not None else CircuitBreaker(name)
+        self._next_tick = 0
+        self._fresh = False
+        self._lock = threading.Lock()
+
+    @property
+    def isBusy(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def is_due(self, tick: int) -> bool:
+        """
+        Проверяет, наступил ли для группы такт опроса (для неотвечающей группы - время пробного опроса)
+        """
+        return tick >= self._next_tick and self.health.allow()
+
+    def schedule(self, tick: int) -> None:
+        """
+        Назначает следующий опрос на ближайший кратный периоду такт
+        """
+        self._next_tick = (tick // self.period_ticks + 1) * self.period_ticks
+
+    def poll(self) -> dict:
+        """
+        Опрашивает группу; при ошибке сохраняются значения предыдущего опроса.
+        Результат опроса учитывается в состоянии работоспособности группы
+        """
+        try:
+            values = self.read()
+            with self._lock:
+                self.values = values
+                self._fresh = True
+            ok = self.check() if self.check is not None else True
+        except Exception as e:
+            print(f"(!) Reader: failed to poll {self.name}: {e}")
+            ok = False
+        self.health.record(ok)
+        return self.values
+
+    def take_fresh(self) -> dict | None:
+        """
+        Возвращает значения, полученные после предыдущего вызова, или None, если новых значений нет
+        """
+        with self._lock:
+            if not self._fresh:
+                return None
+            self._fresh = False
+            return dict(self.values)
+
+    def execute_commands(self, callback: Callable[[str, object, bool], None] | None = None) -> int:
+        """
+        Выполняет накопленные команды группы. Команда считается выполненной, если метод прибора
+        не вызвал исключение и не вернул False или None; результат передаётся в callback(parameter, value, ok)
+
+        Returns:
+            int: количество выполненных команд
+        """
+        commands = self.commands.take()
+        for parameter, func, args in commands:
+            try:
+                result = func(*args)
+                ok = result is not None and result is not False
+            except Exception as e:
+                print(f"(!) Reader: command {parameter} for {self.name} has failed: {e}")
+                ok = False
+            if callback is not None:
+                callback(parameter, args[0] if args else None, ok)
+        return len(commands)
+
+    def serve(self, poll: bool, callback: Callable[[str, object, bool], None] | None = None) -> dict:
+        """
+        Выполняет команды группы и, если наступил такт опроса, опрашивает её.
+        Команды и опрос одного прибора выполняются последовательно в одном потоке и не конкурируют за канал связи
+        """
+        self.execute_commands(callback)
+        return self.poll() if poll else self.values
+
+
+# Наименьший период базовой сетки, мс: периоды опроса округляются до кратных ему,
+# чтобы несоразмерные периоды (например, 333 и 1000 мс) не давали сетку с тактом в 1 мс
+MIN_TICK_PERIOD = 50
+
+
+def base_period(periods: list[float], minimum: int = MIN_TICK_PERIOD) -> float:
+    """
+    Возвращает период базовой сетки (НОД периодов опроса всех групп, округлённых до кратных minimum), мс
+    """
+    return float(math.gcd(*[max(int(round(period / minimum)), 1) for period in periods]) * minimum)
+
+
+# Реестр производных каналов: название канала -> функция расчёта по снимку измерений цикла
+DERIVED_CHANNELS: dict[str, Callable[[dict, dict], float]] = {}
+# Каналы, по которым рассчитывается производный канал (если указаны)
+DERIVED_INPUTS: dict[str, tuple[str, ...]] = {}
+
+
+def derived_channel(name: str, inputs: tuple[str, ...] | None = None) -> Callable:
+    """
+    Декоратор, регистрирующий функцию расчёта производного канала.
+    Функция получает снимок измерений цикла и словарь параметров и возвращает значение канала
+
+    Parameters:
+        name (str): название производного канала
+        inputs (tuple): каналы, по которым рассчитывается значение; производный канал записывается
+                        вместе с ними (без inputs - в каждую запись цикла)
+
+    Returns:
+        Callable: декоратор, добавляющий функцию в реестр DERIVED_CHANNELS
+    """
+    def wrapper(func: Callable[[dict, dict], float]) -> Callable[[dict, dict], float]:
+        DERIVED_CHANNELS[name] = func
+        if inputs is not None:
+            DERIVED_INPUTS[name] = tuple(inputs)
+        return func
+    return wrapper
+
+
+def compute_derived(snapshot: dict, params: dict) -> dict:
+    """
+    Рассчитывает все зарегистрированные производные каналы по снимку измерений цикла,
+    не обращаясь повторно к приборам
+    """
+    result = {}
+    for name, func in DERIVED_CHANNELS.items():
+        try:
+            result[name] = func(snapshot, params)
+        except Exception as e:
+            print(f"(!) Failed to calculate derived channel {name}: {e}")
+            result[name] = 0.0
+    return result
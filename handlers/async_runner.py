@@ -0,0 +1,53 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Coroutine
+
+
+class AsyncLoopThread:
+    """
+    Цикл событий asyncio, работающий в отдельном потоке и общий для всех асинхронных драйверов.
+    Позволяет вызывать сопрограммы из синхронного кода (потоков Reader и GUI)
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="asyncio-drivers", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def get(cls) -> "AsyncLoopThread":
+        """
+        Возвращает общий цикл событий, запуская его при первом обращении
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: Coroutine) -> concurrent.futures.Future:
+        """
+        Запускает сопрограмму в цикле событий, не дожидаясь её завершения
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine, timeout: float | None = None):
+        """
+        Выполняет сопрограмму в цикле событий и возвращает её результат
+
+        Parameters:
+            coroutine (Coroutine): сопрограмма
+            timeout (float): максимальное время ожидания результата, с
+        """
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"operation did not complete in {timeout} s")
@@ -1,9 +1,26 @@
+import json
+import math
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, String, Boolean, REAL, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, REAL, ForeignKey, Index, func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
 import sqlalchemy.sql.default_comparator
 Base = declarative_base()
 
+# Версия схемы файла измерений (PRAGMA user_version); новая версия добавляет таблицы к предыдущей:
+#   0 - info и instruments: измерения цикла в виде JSON строк
+#   1 - info, channels и samples: измерения (время, канал, значение) со справочником каналов
+#   2 - версия 1 и rollups: сводные значения каналов по интервалам ROLLUP_RESOLUTIONS
+#   3 - версия 2 и frame_files: файлы кадров, записанные FrameWriter (см. handlers/frame_file.py)
+SAMPLES_SCHEMA_VERSION = 1
+ROLLUPS_SCHEMA_VERSION = 2
+FRAMES_SCHEMA_VERSION = 3
+SCHEMA_VERSION = FRAMES_SCHEMA_VERSION
+
+# Размеры интервалов сводных таблиц (минимум, максимум, среднее, количество по каналу за интервал), с
+ROLLUP_RESOLUTIONS = (1, 10, 60, 600)
+
 
 class Info(Base):
     __tablename__ = 'info'
@@ -31,6 +48,164 @@ class Instruments(Base):
     aux_values = Column(String)
 
 
+class Channels(Base):
+    __tablename__ = 'channels'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)  # название канала (sample_voltage, CH0, ...)
+    kind = Column(String, nullable=False)               # группа каналов: instruments или thermocouples
+
+
+class Samples(Base):
+    __tablename__ = 'samples'
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(REAL, nullable=False, index=True)  # время измерения, с (Unix time)
+    channel_id = Column(Integer, ForeignKey('channels.id'), nullable=False)
+    value = Column(REAL)
+    __table_args__ = (Index('ix_samples_channel_timestamp', 'channel_id', 'timestamp'),)
+
+
+class Rollups(Base):
+    __tablename__ = 'rollups'
+    resolution = Column(Integer, primary_key=True)  # размер интервала, с
+    channel_id = Column(Integer, ForeignKey('channels.id'), primary_key=True)
+    bucket = Column(REAL, primary_key=True)         # начало интервала, с (Unix time)
+    min = Column(REAL)
+    max = Column(REAL)
+    sum = Column(REAL)                              # сумма значений (среднее = sum / count)
+    count = Column(Integer)
+
+
+class FrameFiles(Base):
+    __tablename__ = 'frame_files'
+    id = Column(Integer, primary_key=True)
+    path = Column(String, nullable=False)   # файл кадров относительно каталога файла измерений
+    dtype = Column(String, nullable=False)  # тип значений каналов: float32 или float64
+    channels = Column(String)               # json список каналов в порядке полей кадра
+    first_timestamp = Column(REAL)          # время первого и последнего кадра, с (Unix time)
+    last_timestamp = Column(REAL)
+    frames = Column(Integer, default=0)     # количество записанных кадров
+
+
+def create_schema(engine: Engine) -> None:
+    """
+    Создаёт в файле измерений таблицы текущей версии схемы (недостающие, если файл создан в прежней версии)
+    и записывает номер версии
+    """
+    Base.metadata.create_all(engine, tables=[Info.__table__, Channels.__table__, Samples.__table__, Rollups.__table__,
+                                           FrameFiles.__table__])
+    with engine.begin() as connection:
+        connection.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+
+
+def get_schema_version(connection: Connection) -> int:
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+
+def aggregate_rollups(samples: list[dict], resolutions=ROLLUP_RESOLUTIONS) -> list[dict]:
+    """
+    Сворачивает строки таблицы samples в строки сводных таблиц для всех размеров интервала
+    """
+    rollups = {}
+    for sample in samples:
+        value = sample["value"]
+        for resolution in resolutions:
+            key = (resolution, sample["channel_id"], int(sample["timestamp"] // resolution) * resolution)
+            if key in rollups:
+                rollup = rollups[key]
+                rollup["min"] = min(rollup["min"], value)
+                rollup["max"] = max(rollup["max"], value)
+                rollup["sum"] += value
+                rollup["count"] += 1
+            else:
+                rollups[key] = {"resolution": key[0], "channel_id": key[1], "bucket": key[2],
+                                "min": value, "max": value, "sum": value, "count": 1}
+    return list(rollups.values())
+
+
+def write_rollups(connection: Connection, rollups: list[dict]) -> None:
+    """
+    Добавляет к сводным таблицам результаты aggregate_rollups: существующие интервалы дополняются,
+    поэтому сводные таблицы обновляются по мере записи измерений без повторного чтения samples
+    """
+    if not rollups:
+        return
+    statement = sqlite_insert(Rollups.__table__)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=["resolution", "channel_id", "bucket"],
+        set_={
+            "min": func.min(Rollups.__table__.c.min, statement.excluded.min),
+            "max": func.max(Rollups.__table__.c.max, statement.excluded.max),
+            "sum": Rollups.__table__.c.sum + statement.excluded.sum,
+            "count": Rollups.__table__.c.count + statement.excluded.count
+        }
+    ), rollups)
+
+
+def rebuild_rollups(connection: Connection, resolutions=ROLLUP_RESOLUTIONS) -> None:
+    """
+    Заново строит сводные таблицы по всей таблице samples (группировка выполняется средствами SQLite)
+    """
+    Rollups.__table__.create(connection, checkfirst=True)
+    connection.execute(Rollups.__table__.delete())
+    for resolution in resolutions:
+        connection.execute(text(
+            "INSERT INTO rollups (resolution, channel_id, bucket, min, max, sum, count) "
+            "SELECT :resolution, channel_id, CAST(timestamp / :resolution AS INTEGER) * :resolution AS bucket, "
+            "min(value), max(value), sum(value), count(value) FROM samples "
+            "WHERE value IS NOT NULL GROUP BY channel_id, bucket"
+        ), {"resolution": resolution})
+
+
+def parse_legacy_values(data: str | None) -> dict:
+    """
+    Разбирает JSON строку с измерениями из таблицы instruments прежней схемы
+    """
+    try:
+        values = json.loads(data) if data else {}
+    except ValueError:
+        return {}
+    return values if isinstance(values, dict) else {}
+
+
+class ChannelRegistry:
+    """
+    Справочник каналов: название канала -> id в таблице channels.
+    Каналы, встретившиеся впервые, добавляются в таблицу в той же транзакции, что и измерения
+    """
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self._loaded = False
+
+    def resolve(self, connection: Connection, kind: str, name: str) -> int:
+        if not self._loaded:
+            self.ids.update({row.name: row.id for row in connection.execute(select(Channels.id, Channels.name))})
+            self._loaded = True
+        if name not in self.ids:
+            self.ids[name] = connection.execute(Channels.__table__.insert().values(name=name, kind=kind)).inserted_primary_key[0]
+        return self.ids[name]
+
+    def rows(self, connection: Connection, timestamp: float, groups: dict[str, dict]) -> list[dict]:
+        """
+        Преобразует измерения одного цикла в строки таблицы samples
+
+        Parameters:
+            timestamp (float): время измерения, с
+            groups (dict): группа каналов (instruments, thermocouples) -> {название канала: значение};
+                           значения NaN (канал в этом цикле не опрошен) не записываются
+        """
+        rows = []
+        for kind, values in groups.items():
+            for name, value in values.items():
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                if math.isnan(value):
+                    continue
+                rows.append({"timestamp": timestamp, "channel_id": self.resolve(connection, kind, name), "value": value})
+        return rows
+
+
 # class Methods(Base):
 #     __tablename__ = 'methods'
 #     id = Column(Integer, primary_key=True)
@@ -0,0 +1,269 @@
+import json
+import os
+from typing import Iterator, NamedTuple
+import numpy as np
+from sqlalchemy import REAL, cast, create_engine, select
+from sqlalchemy.engine import Connection
+from handlers.database_handler import (Channels, FrameFiles, Instruments, Rollups, Samples, FRAMES_SCHEMA_VERSION,
+                                       ROLLUP_RESOLUTIONS, ROLLUPS_SCHEMA_VERSION, SAMPLES_SCHEMA_VERSION,
+                                       get_schema_version, parse_legacy_values)
+from handlers.frame_file import open_frames
+
+
+class ExperimentData(NamedTuple):
+    """
+    Данные эксперимента: время измерений (Unix time, с) и значения каналов,
+    выровненные по времени (NaN, если канал в этом цикле не записан)
+    """
+    timestamps: np.ndarray
+    channels: dict[str, np.ndarray]
+
+
+class RollupData(NamedTuple):
+    """
+    Сводные значения канала: начало интервала (Unix time, с), минимум, максимум, среднее и количество измерений
+    """
+    buckets: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+    count: np.ndarray
+
+
+def list_channels(path: str) -> list[str]:
+    """
+    Возвращает названия каналов, записанных в файле эксперимента (в том числе в файлах кадров)
+    """
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        with engine.connect() as connection:
+            if get_schema_version(connection) >= SAMPLES_SCHEMA_VERSION:
+                names = dict.fromkeys(connection.execute(select(Channels.name).order_by(Channels.id)).scalars())
+                for _, channels in _frame_files(connection):
+                    names.update(dict.fromkeys(channels))
+                return list(names)
+            table = Instruments.__table__
+            names = {}
+            result = connection.execution_options(stream_results=True).execute(
+                select(table.c.instruments_values, table.c.thermocouples_values).order_by(table.c.id))
+            for instruments, thermocouples in result:
+                names.update(dict.fromkeys(parse_legacy_values(instruments)))
+                names.update(dict.fromkeys(parse_legacy_values(thermocouples)))
+            return list(names)
+    finally:
+        engine.dispose()
+
+
+def load_experiment(path: str, channels: list[str] | None = None, start: float | None = None,
+                    stop: float | None = None, chunk_size: int = 200000) -> ExperimentData:
+    """
+    Загружает измерения эксперимента в массивы NumPy.
+    Поддерживаются файлы текущей схемы (таблица samples или файлы кадров, перечисленные в таблице frame_files)
+    и прежней схемы (JSON строки в таблице instruments).
+    Записи читаются порциями по chunk_size строк; из базы выбираются только нужные каналы и интервал времени.
+    Значения из файлов кадров копируются в новые массивы; для чтения без копирования - load_frames
+
+    Parameters:
+        path (str): файл эксперимента (.db)
+        channels (list): названия каналов (по умолчанию - все каналы)
+        start (float): начало интервала времени, с (включительно)
+        stop (float): конец интервала времени, с (включительно)
+        chunk_size (int): количество строк, считываемых за одно обращение к базе
+
+    Returns:
+        ExperimentData: время измерений и значения каналов
+    """
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        with engine.connect() as connection:
+            if get_schema_version(connection) >= SAMPLES_SCHEMA_VERSION:
+                frame_files = _frame_files(connection)
+                if frame_files:
+                    return _load_frame_data(path, frame_files, channels, start, stop)
+                return _load_samples(connection, channels, start, stop, chunk_size)
+            return _load_legacy(connection, channels, start, stop, chunk_size)
+    finally:
+        engine.dispose()
+
+
+def load_rollups(path: str, resolution: int, channels: list[str] | None = None, start: float | None = None,
+                 stop: float | None = None) -> dict[str, RollupData]:
+    """
+    Загружает сводные значения каналов (минимум, максимум, среднее, количество) по интервалам
+    длительностью resolution секунд. Подходит для обзорных графиков и статистики длинных экспериментов.
+    Файлы без сводных таблиц (версия схемы ниже ROLLUPS_SCHEMA_VERSION) нужно предварительно обработать:
+    python migrate_database.py
+
+    Parameters:
+        path (str): файл эксперимента (.db)
+        resolution (int): длительность интервала, с (одно из значений ROLLUP_RESOLUTIONS)
+        channels (list): названия каналов (по умолчанию - все каналы)
+        start (float): начало интервала времени, с (интервалы, начинающиеся раньше, не включаются)
+        stop (float): конец интервала времени, с (включительно)
+
+    Returns:
+        dict: сводные значения по названию канала
+    """
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {ROLLUP_RESOLUTIONS}")
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        with engine.connect() as connection:
+            version = get_schema_version(connection)
+            if version < ROLLUPS_SCHEMA_VERSION:
+                raise ValueError(f"{path} has no rollup tables (schema version {version}), "
+                                 f"convert it with: python migrate_database.py {path}")
+            ids = dict(connection.execute(select(Channels.name, Channels.id).order_by(Channels.id)).all())
+            names = list(ids) if channels is None else [name for name in channels if name in ids]
+            table = Rollups.__table__
+            query = (select(table.c.bucket, table.c.min, table.c.max, table.c.sum, table.c.count)
+                     .where(table.c.resolution == resolution).order_by(table.c.bucket))
+            if start is not None:
+                query = query.where(table.c.bucket >= start)
+            if stop is not None:
+                query = query.where(table.c.bucket <= stop)
+            rollups = {}
+            for name in names:
+                rows = connection.execute(query.where(table.c.channel_id == ids[name])).cursor.fetchall()
+                data = np.array(rows, dtype=float).reshape(-1, 5)
+                rollups[name] = RollupData(data[:, 0], data[:, 1], data[:, 2], data[:, 3] / data[:, 4],
+                                           data[:, 4].astype(np.int64))
+            return rollups
+    finally:
+        engine.dispose()
+
+
+def list_frame_files(path: str) -> list[str]:
+    """
+    Возвращает пути файлов кадров, записанных к файлу эксперимента (в порядке записи)
+    """
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        with engine.connect() as connection:
+            directory = os.path.dirname(os.path.abspath(path))
+            return [os.path.join(directory, file) for file, _ in _frame_files(connection)]
+    finally:
+        engine.dispose()
+
+
+def load_frames(path: str, start: float | None = None, stop: float | None = None) -> list[np.ndarray]:
+    """
+    Отображает в память файлы кадров эксперимента (см. handlers/frame_file.py) без копирования данных.
+    Каждый элемент списка - кадры одного файла (numpy.memmap со структурой: timestamp и поля каналов);
+    при ограничении интервала времени возвращаются срезы отображений, которые также не копируют данные
+
+    Parameters:
+        path (str): файл эксперимента (.db)
+        start (float): начало интервала времени, с (включительно)
+        stop (float): конец интервала времени, с (включительно)
+
+    Returns:
+        list: кадры по файлам; файлы без кадров в интервале не включаются
+    """
+    chunks = []
+    for file in list_frame_files(path):
+        frames = open_frames(file)
+        timestamps = frames['timestamp']
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        last = len(frames) if stop is None else int(np.searchsorted(timestamps, stop, side='right'))
+        if first < last:
+            chunks.append(frames[first:last])
+    return chunks
+
+
+def _frame_files(connection: Connection) -> list[tuple[str, list[str]]]:
+    """
+    Возвращает файлы кадров (путь относительно файла эксперимента и названия каналов) в порядке записи
+    """
+    if get_schema_version(connection) < FRAMES_SCHEMA_VERSION:
+        return []
+    rows = connection.execute(select(FrameFiles.path, FrameFiles.channels).order_by(FrameFiles.id)).all()
+    return [(file, json.loads(channels)) for file, channels in rows]
+
+
+def _load_frame_data(path: str, frame_files: list[tuple[str, list[str]]], channels: list[str] | None,
+                     start: float | None, stop: float | None) -> ExperimentData:
+    recorded = list(dict.fromkeys(name for _, names in frame_files for name in names))
+    names = recorded if channels is None else [name for name in channels if name in recorded]
+    chunks = load_frames(path, start, stop)
+    if not chunks:
+        return ExperimentData(np.empty(0), {name: np.empty(0) for name in names})
+
+    # новый канал начинает новый файл, поэтому в ранних файлах его может не быть
+    values = {}
+    for name in names:
+        values[name] = np.concatenate([np.asarray(frames[name], dtype=float) if name in frames.dtype.names
+                                       else np.full(len(frames), np.nan) for frames in chunks])
+    return ExperimentData(np.concatenate([frames['timestamp'] for frames in chunks]), values)
+
+
+def _fetch_chunks(connection: Connection, query, chunk_size: int) -> Iterator[list[tuple]]:
+    """
+    Выполняет запрос и возвращает строки порциями. Строки читаются непосредственно курсором DBAPI (кортежами),
+    без построения объектов Row SQLAlchemy, что в несколько раз ускоряет чтение больших таблиц
+    """
+    result = connection.execute(query)
+    try:
+        while rows := result.cursor.fetchmany(chunk_size):
+            yield rows
+    finally:
+        result.close()
+
+
+def _load_samples(connection: Connection, channels: list[str] | None, start: float | None, stop: float | None,
+                  chunk_size: int) -> ExperimentData:
+    ids = dict(connection.execute(select(Channels.name, Channels.id).order_by(Channels.id)).all())
+    names = list(ids) if channels is None else [name for name in channels if name in ids]
+
+    query = select(Samples.timestamp, Samples.channel_id, Samples.value)
+    if channels is not None:
+        query = query.where(Samples.channel_id.in_([ids[name] for name in names]))
+    if start is not None:
+        query = query.where(Samples.timestamp >= start)
+    if stop is not None:
+        query = query.where(Samples.timestamp <= stop)
+
+    chunks = [np.array(rows, dtype=float) for rows in _fetch_chunks(connection, query, chunk_size)]
+    data = np.concatenate(chunks) if chunks else np.empty((0, 3))
+
+    # все каналы цикла записываются с одним временем, поэтому строки группируются по времени
+    timestamps, index = np.unique(data[:, 0], return_inverse=True)
+    channel_ids = data[:, 1].astype(np.int64)
+    values = {}
+    for name in names:
+        column = np.full(len(timestamps), np.nan)
+        mask = channel_ids == ids[name]
+        column[index[mask]] = data[mask, 2]
+        values[name] = column
+    return ExperimentData(timestamps, values)
+
+
+def _load_legacy(connection: Connection, channels: list[str] | None, start: float | None, stop: float | None,
+                 chunk_size: int) -> ExperimentData:
+    table = Instruments.__table__
+    timestamp = cast(table.c.timestamp_abs, REAL)
+    query = select(timestamp, table.c.instruments_values, table.c.thermocouples_values).order_by(table.c.id)
+    if start is not None:
+        query = query.where(timestamp >= start)
+    if stop is not None:
+        query = query.where(timestamp <= stop)
+
+    timestamps = []
+    columns: dict[str, list] = {name: [] for name in channels} if channels is not None else {}
+    for rows in _fetch_chunks(connection, query, chunk_size):
+        for time_value, instruments, thermocouples in rows:
+            if time_value is None:
+                continue
+            values = parse_legacy_values(instruments)
+            values.update(parse_legacy_values(thermocouples))
+            if channels is None:
+                for name in values.keys() - columns.keys():
+                    columns[name] = [np.nan] * len(timestamps)  # канал появился не с начала записи
+            for name, column in columns.items():
+                value = values.get(name)
+                column.append(value if isinstance(value, (int, float)) else np.nan)
+            timestamps.append(time_value)
+
+    order = np.argsort(np.asarray(timestamps, dtype=float), kind='stable')
+    return ExperimentData(np.asarray(timestamps, dtype=float)[order],
+                          {name: np.asarray(column, dtype=float)[order] for name, column in columns.items()})
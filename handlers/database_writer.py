@@ -0,0 +1,253 @@
+import json
+import math
+import os
+import queue
+import threading
+import time
+import numpy as np
+from sqlalchemy import Table, event
+from sqlalchemy.engine import Connection, Engine
+from handlers.database_handler import ChannelRegistry, FrameFiles, Samples, aggregate_rollups, write_rollups
+from handlers.frame_file import frame_dtype, write_header
+
+
+def enable_wal(engine: Engine) -> None:
+    """
+    Включает журнал WAL для всех соединений с базой SQLite: запись не блокирует чтение,
+    а при synchronous=NORMAL синхронизация с диском выполняется при контрольных точках, а не при каждой транзакции
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+class DatabaseWriter:
+    """
+    Фоновая запись строк в базу данных. Строки передаются через очередь и вставляются пакетами
+    (SQLAlchemy Core, executemany) в отдельном потоке; транзакция фиксируется, когда накоплено
+    batch_size строк или с момента поступления первой строки пакета прошло flush_interval секунд.
+    Вызывающий поток (GUI) только помещает строку в очередь
+    """
+    _STOP = object()
+
+    def __init__(self, engine: Engine, table: Table, batch_size: int = 100, flush_interval: float = 1.0,
+                 queue_size: int = 100000):
+        self.engine = engine
+        self.table = table
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = flush_interval    # наибольшее время ожидания записи строки, с
+        self.written = 0                        # количество записанных строк
+        self.dropped = 0                        # строки, не поместившиеся в очередь
+        self.failed = 0                         # строки, запись которых завершилась ошибкой
+        self.__queue = queue.Queue(maxsize=queue_size)
+        self.__thread = threading.Thread(target=self.__run, name="database-writer", daemon=True)
+        self.__thread.start()
+
+    @property
+    def pending(self) -> int:
+        """
+        Количество строк, ожидающих записи в очереди
+        """
+        return self.__queue.qsize()
+
+    @property
+    def isRunning(self) -> bool:
+        return self.__thread.is_alive()
+
+    def put(self, row) -> bool:
+        """
+        Ставит строку в очередь записи, не ожидая обращения к базе
+
+        Returns:
+            bool: False, если очередь переполнена и строка отброшена
+        """
+        try:
+            self.__queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"(!) Database writer: queue is full, {self.dropped} rows dropped")
+            return False
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """
+        Записывает накопленные строки и останавливает поток записи, ожидая не дольше timeout
+
+        Returns:
+            bool: True, если все строки записаны за отведённое время
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            self.__queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.__thread.join(max(deadline - time.monotonic(), 0.0))
+        if self.__thread.is_alive():
+            print(f"(!) Database writer: not finished in {timeout} s, {self.pending} rows are not written")
+            return False
+        return True
+
+    def __run(self) -> None:
+        batch = []
+        deadline = 0.0
+        while True:
+            try:
+                row = self.__queue.get(timeout=max(deadline - time.monotonic(), 0.0) if batch else None)
+            except queue.Empty:
+                row = None
+            if row is self._STOP:
+                break
+            if row is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(row)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self.__write(batch)
+                batch = []
+        self.__write(batch)
+        self._close()
+
+    def __write(self, rows: list) -> None:
+        if not rows:
+            return
+        try:
+            with self.engine.begin() as connection:
+                self._insert(connection, rows)
+            self.written += len(rows)
+        except Exception as e:
+            self.failed += len(rows)
+            print(f"(!) Database writer: failed to write {len(rows)} rows: {e}")
+
+    def _insert(self, connection: Connection, rows: list) -> None:
+        connection.execute(self.table.insert(), rows)
+
+    def _close(self) -> None:
+        """
+        Вызывается в потоке записи после записи последнего пакета
+        """
+        pass
+
+
+class SampleWriter(DatabaseWriter):
+    """
+    Фоновая запись измерений в таблицу samples. В очередь помещается измерение цикла
+    (время, {группа каналов: {канал: значение}}), которое при записи разворачивается в строки
+    (время, канал, значение); новые каналы добавляются в справочник channels.
+    В той же транзакции пакет сворачивается в сводные таблицы rollups
+    """
+    def __init__(self, engine: Engine, **kwargs):
+        self.channels = ChannelRegistry()
+        super().__init__(engine, Samples.__table__, **kwargs)
+
+    def _insert(self, connection: Connection, rows: list) -> None:
+        try:
+            samples = []
+            for timestamp, groups in rows:
+                samples += self.channels.rows(connection, timestamp, groups)
+            if samples:
+                connection.execute(self.table.insert(), samples)
+                write_rollups(connection, aggregate_rollups(samples))
+        except Exception:
+            # добавленные в этой транзакции каналы откатываются вместе с ней
+            self.channels = ChannelRegistry()
+            raise
+
+
+class FrameWriter(DatabaseWriter):
+    """
+    Фоновая запись измерений в двоичные файлы кадров (см. handlers/frame_file.py) вместо таблицы samples.
+    Принимает те же измерения цикла, что и SampleWriter. Каждый цикл записывается в конец файла кадром
+    фиксированной длины; файл заменяется новым после chunk_frames кадров или при изменении состава каналов.
+    Файлы создаются рядом с файлом измерений (<имя>.0001.frames, ...) и перечисляются в таблице frame_files,
+    где вместе с каждым пакетом обновляются количество кадров и время последнего кадра.
+    В той же транзакции пакет сворачивается в сводные таблицы rollups, как при записи в samples
+    """
+    def __init__(self, engine: Engine, directory: str, name: str, dtype: str = 'float32',
+                 chunk_frames: int = 100000, **kwargs):
+        self.directory = directory
+        self.name = name
+        self.dtype = dtype
+        self.chunk_frames = max(int(chunk_frames), 1)
+        self.chunks = 0         # количество созданных файлов кадров
+        self.channels = ChannelRegistry()
+        self.__file = None
+        self.__file_id = None
+        self.__layout = None
+        self.__frames = 0
+        frame_dtype([], dtype)  # проверка типа значений до запуска потока записи
+        super().__init__(engine, FrameFiles.__table__, **kwargs)
+
+    def _insert(self, connection: Connection, rows: list) -> None:
+        try:
+            samples = []
+            for timestamp, groups in rows:
+                samples += self.channels.rows(connection, timestamp, groups)
+            write_rollups(connection, aggregate_rollups(samples))
+            for layout, frames in self.__frames_by_layout(rows):
+                while frames:
+                    if layout != self.__layout or self.__frames >= self.chunk_frames:
+                        self.__open(connection, layout)
+                    count = min(len(frames), self.chunk_frames - self.__frames)
+                    self.__append(connection, frames[:count])
+                    frames = frames[count:]
+        except Exception:
+            # следующий пакет будет записан в новый файл, а добавленные в этой транзакции каналы откатываются
+            self.channels = ChannelRegistry()
+            self._close()
+            raise
+
+    def _close(self) -> None:
+        if self.__file is not None:
+            self.__file.close()
+        self.__file = None
+        self.__layout = None
+
+    @staticmethod
+    def __frames_by_layout(rows: list) -> list[tuple[tuple, list]]:
+        """
+        Разбивает измерения на последовательные участки с одинаковым составом каналов
+        """
+        segments = []
+        for timestamp, groups in rows:
+            layout, values = [], []
+            for kind, group in groups.items():
+                for name, value in group.items():
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        value = math.nan
+                    layout.append((kind, name))
+                    values.append(value)
+            layout = tuple(layout)
+            if not segments or segments[-1][0] != layout:
+                segments.append((layout, []))
+            segments[-1][1].append((timestamp, *values))
+        return segments
+
+    def __open(self, connection: Connection, layout: tuple) -> None:
+        self._close()
+        self.chunks += 1
+        filename = f'{self.name}.{self.chunks:04d}.frames'
+        channels = [name for _, name in layout]
+        self.__file = open(os.path.join(self.directory, filename), 'wb')
+        write_header(self.__file, channels, [kind for kind, _ in layout], self.dtype)
+        self.__file.flush()
+        self.__file_id = connection.execute(self.table.insert().values(
+            path=filename, dtype=self.dtype, channels=json.dumps(channels), frames=0)).inserted_primary_key[0]
+        self.__layout = layout
+        self.__frames = 0
+
+    def __append(self, connection: Connection, frames: list[tuple]) -> None:
+        data = np.array(frames, dtype=frame_dtype([name for _, name in self.__layout], self.dtype))
+        self.__file.write(data.tobytes())
+        self.__file.flush()
+        first = self.__frames == 0
+        self.__frames += len(data)
+        values = {"frames": self.__frames, "last_timestamp": float(data['timestamp'][-1])}
+        if first:
+            values["first_timestamp"] = float(data['timestamp'][0])
+        connection.execute(self.table.update().where(self.table.c.id == self.__file_id).values(**values))
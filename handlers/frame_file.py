@@ -0,0 +1,63 @@
+import json
+import os
+import struct
+import numpy as np
+
+# Файл кадров: сигнатура (8 байт), длина заголовка (uint32 little-endian), заголовок JSON, дополненный
+# пробелами до границы FRAME_ALIGNMENT байт, затем кадры фиксированной длины: время (float64) и значения каналов
+FRAME_MAGIC = b'PLMFRM01'
+FRAME_VERSION = 1
+FRAME_ALIGNMENT = 64
+FRAME_DTYPES = ('float32', 'float64')
+
+
+def frame_dtype(channels: list[str], dtype: str = 'float32') -> np.dtype:
+    """
+    Структура кадра: поле timestamp (Unix time, с) и по одному полю на канал
+    """
+    if dtype not in FRAME_DTYPES:
+        raise ValueError(f"dtype must be one of {FRAME_DTYPES}")
+    return np.dtype([('timestamp', '<f8')] + [(name, np.dtype(dtype).newbyteorder('<')) for name in channels])
+
+
+def write_header(file, channels: list[str], kinds: list[str], dtype: str = 'float32') -> int:
+    """
+    Записывает заголовок файла кадров с описанием каналов
+
+    Returns:
+        int: смещение первого кадра от начала файла, байт
+    """
+    header = json.dumps({"version": FRAME_VERSION, "dtype": dtype, "channels": channels, "kinds": kinds}).encode()
+    prefix = len(FRAME_MAGIC) + 4
+    size = -(-(prefix + len(header)) // FRAME_ALIGNMENT) * FRAME_ALIGNMENT - prefix
+    file.write(FRAME_MAGIC + struct.pack('<I', size) + header.ljust(size, b' '))
+    return prefix + size
+
+
+def read_header(path: str) -> tuple[dict, int]:
+    """
+    Читает заголовок файла кадров
+
+    Returns:
+        tuple: заголовок (version, dtype, channels, kinds) и смещение первого кадра, байт
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(FRAME_MAGIC)) != FRAME_MAGIC:
+            raise ValueError(f"{path} is not a frame file")
+        size, = struct.unpack('<I', file.read(4))
+        header = json.loads(file.read(size))
+    return header, len(FRAME_MAGIC) + 4 + size
+
+
+def open_frames(path: str) -> np.ndarray:
+    """
+    Отображает кадры файла в память (numpy.memmap, только чтение) без копирования данных.
+    Неполный последний кадр (запись прервана) не включается.
+    Значения канала - поле массива: frames['CH0'], время - frames['timestamp']
+    """
+    header, offset = read_header(path)
+    dtype = frame_dtype(header["channels"], header["dtype"])
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count <= 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
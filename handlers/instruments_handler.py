@@ -1,26 +1,49 @@
 from nidaqmx import Task, constants
-from pymodbus.client import ModbusSerialClient, ModbusTcpClient
+from pymodbus.client import ModbusSerialClient, ModbusTcpClient, AsyncModbusSerialClient, AsyncModbusTcpClient
 from pymodbus import FramerType
+from handlers.async_runner import AsyncLoopThread
+import asyncio
 import socket
+import threading
 import time
 import serial
+import json
+import os
+import statistics
+from typing import Callable, NamedTuple
+from contextlib import contextmanager
 
 
 class SCPIInstrument:
     """
     Класс, реализующий управление источниками питания через протокол SCPI
     """
-    def __init__(self, rm, connection_type, ip, port, name, sleep_time=0.01):
-        
-        self.name = name  # название прибора
-        self.isInitialized = bool()  # флаг инициализации
-        self.state = {
-            "voltage": 0.0,
-            "current": 0.0,
-            "power": 0.0,
-            "output": 0,
-            "remote": 0
-        }
+    # Команды измерения величин, используемые при составных запросах
+    MEASURE_COMMANDS = {
+        "voltage": "MEASURE:VOLTAGE?",
+        "current": "MEASURE:CURRENT?",
+        "power": "MEASURE:POWER?"
+    }
+
+    # Режимы блокировки прибора средствами VISA:
+    #   query       - блокировка на время каждой команды (по умолчанию)
+    #   transaction - блокировка на время транзакции (группы команд, см. transaction()) и каждого опроса measure_all;
+    #                 отдельные команды установки параметров выполняются без блокировки VISA
+    #   session     - исключительная блокировка на всё время работы с прибором
+    #   none        - без блокировки VISA
+    LOCK_MODES = ("query", "transaction", "session", "none")
+
+    # Количество неудачных составных запросов подряд (без явного отказа прибора), после которого
+    # прибор опрашивается отдельными запросами
+    COMPOUND_FAILURE_LIMIT = 3
+
+    DEFAULT_QUERY_DELAY = 0.01  # задержка между отправкой запроса и чтением ответа по умолчанию, с
+    # Задержки, проверяемые при автоматической калибровке, с
+    QUERY_DELAY_CANDIDATES = (0.0, 0.0005, 0.001, 0.002, 0.005)
+
+    def __init__(self, rm, connection_type, ip, port, name, sleep_time=DEFAULT_QUERY_DELAY, lock_mode='query'):
+        # задержка для запросов; "auto" - подбирается калибровкой после подключения
+        self._init_state(name, self.DEFAULT_QUERY_DELAY if sleep_time == 'auto' else float(sleep_time), lock_mode)
         try:
             if connection_type == 'TCPIP':  # Первый способ установки соединения с прибором
                 self.instrument = rm.open_resource(f'TCPIP::{ip}::inst0::INSTR')
@@ -28,56 +51,239 @@ class SCPIInstrument:
                 self.instrument = rm.open_resource(f'TCPIP::{ip}::{port}::SOCKET')
                 self.instrument.write_termination = '\n'
                 self.instrument.read_termination = '\n'
-            self.instrument.query_delay = sleep_time # задержка для команд
-            print(f'(+) {self.name} initialized: {self.get_identification()}')
+            if connection_type not in ('TCPIP', 'SOCKET'):
+                raise ValueError(f'unknown connection type {connection_type}')
+            self.instrument.query_delay = self.query_delay # задержка для команд
+            if self.lock_mode == 'session':
+                try:
+                    self.instrument.lock_excl()
+                    self._session_locked = True
+                except Exception as e:
+                    # Прибор остаётся защищённым только блокировкой потоков
+                    print(f'(!) {self.name}: exclusive lock is not available, continuing without VISA lock: {e}')
+                    self.lock_mode = 'none'
+            self.identification = self.get_identification().strip()
+            print(f'(+) {self.name} initialized: {self.identification}')
             self.isInitialized = True
 
         except Exception as e:
             self.instrument = None
             print(f'(!) {self.name} failed to initialize:\t{e}')
             self.IsInitialized = False
+
+        if self.isInitialized and sleep_time == 'auto':
+            self.calibrate_query_delay()
+
+    @classmethod
+    def offline(cls, name: str) -> "SCPIInstrument":
+        """
+        Создаёт неподключенный прибор без обращения к VISA (прибор не подключился при запуске)
+        """
+        instrument = cls.__new__(cls)
+        instrument._init_state(name, cls.DEFAULT_QUERY_DELAY, 'query')
+        instrument.instrument = None
+        return instrument
+
+    def _init_state(self, name: str, query_delay: float, lock_mode: str) -> None:
+        """
+        Состояние драйвера, общее для всех способов подключения к источнику питания
+        """
+        self.name = name  # название прибора
+        self.isInitialized = False  # флаг инициализации
+        self.compound_supported = None  # поддержка составных запросов (None - ещё не проверялась)
+        self.compound_failures = 0  # неудачные составные запросы подряд
+        self._link_lost = False  # отдельные запросы завершились ошибкой: после восстановления связи составные запросы проверяются заново
+        self.last_read_ok = False  # результат последнего опроса measure_all
+        self.lock_mode = lock_mode if lock_mode in self.LOCK_MODES else 'query'  # режим блокировки VISA
+        self.io_lock = threading.RLock()  # сериализация обращений из потоков GUI и Reader
+        self._transaction_depth = 0
+        self._session_locked = False
+        self.query_delay = query_delay  # задержка между запросом и чтением ответа, с
+        self.turnaround = None  # медианное время выполнения запроса, с
+        self.identification = None  # ответ прибора на *IDN?
+        self.verify_setpoints = False  # подтверждать выполнение уставок запросом *OPC?
+        self.state = {
+            "voltage": 0.0,
+            "current": 0.0,
+            "power": 0.0,
+            "output": 0,
+            "remote": 0
+        }
+
+    def calibrate_query_delay(self, candidates=QUERY_DELAY_CANDIDATES, attempts: int = 10) -> float:
+        """
+        Подбирает минимальную задержку query_delay, при которой прибор стабильно отвечает на запросы.
+        Задержки из candidates, меньшие текущей, проверяются по возрастанию: задержка считается стабильной,
+        если все attempts пар запросов (*IDN? и измерение напряжения) выполнены без ошибок, а ответы
+        совпадают по содержанию и формату с ответами при текущей задержке. Если ни одна задержка
+        не оказалась стабильной, сохраняется текущая
+
+        Returns:
+            float: выбранная задержка, с
+        """
+        timeout = self.instrument.timeout
+        try:
+            with self.transaction():
+                reference = self._query('*IDN?').strip()
+                # Пропущенный прибором запрос не должен задерживать калибровку на полный таймаут VISA
+                self.instrument.timeout = 500
+                for delay in sorted(candidates):
+                    if delay >= self.query_delay:
+                        break
+                    self.instrument.query_delay = delay
+                    turnaround = self._probe_query_delay(reference, attempts)
+                    if turnaround is not None:
+                        self.query_delay = delay
+                        self.turnaround = turnaround
+                        break
+                    self._clear_instrument()
+        except Exception as e:
+            print(f'(!) {self.name}: query delay calibration has failed: {e}')
+        finally:
+            if self.instrument is not None:
+                self.instrument.timeout = timeout
+                self.instrument.query_delay = self.query_delay
+        print(f'(+) {self.name}: query delay {self.query_delay * 1e3:.1f} ms')
+        return self.query_delay
+
+    def set_query_delay(self, delay: float) -> None:
+        """
+        Устанавливает задержку между отправкой запроса и чтением ответа, с
+        """
+        self.query_delay = float(delay)
+        if self.instrument is not None:
+            self.instrument.query_delay = self.query_delay
+
+    def _probe_query_delay(self, reference: str, attempts: int) -> float | None:
+        """
+        Выполняет серию пробных запросов при установленной задержке.
+        Возвращает медианное время выполнения запроса или None, если прибор отвечал нестабильно
+        """
+        durations = []
+        try:
+            for _ in range(attempts):
+                start = time.perf_counter()
+                identification = self._query('*IDN?').strip()
+                durations.append(time.perf_counter() - start)
+                if identification != reference:
+                    return None
+                float(self._query('MEASURE:VOLTAGE?').strip('\x00'))
+        except Exception:
+            return None
+        return statistics.median(durations)
+
+    def _clear_instrument(self) -> None:
+        # Сбрасывает буферы прибора, чтобы запоздавшие ответы не попали в следующую серию запросов
+        try:
+            self.instrument.clear()
+        except Exception:
+            pass
     
+    @contextmanager
+    def transaction(self):
+        """
+        Контекстный менеджер для группы команд: прибор блокируется (потоком и, в режимах query
+        и transaction, средствами VISA) один раз на всю группу, а не на каждую команду
+        """
+        with self.io_lock:
+            visa_lock = self._transaction_depth == 0 and self.lock_mode in ('query', 'transaction')
+            if visa_lock:
+                self.instrument.lock()
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+                if visa_lock:
+                    self.instrument.unlock()
+
+    @contextmanager
+    def _command_lock(self):
+        """
+        Блокировка на время одной команды: блокировка VISA запрашивается только в режиме query вне транзакции
+        """
+        with self.io_lock:
+            if self.lock_mode == 'query' and self._transaction_depth == 0:
+                self.instrument.lock()
+                try:
+                    yield
+                finally:
+                    self.instrument.unlock()
+            else:
+                yield
+
     def _query(self, command: str):
         """
         Обёртка над вызовом SCPI комманд
         """
         try:
-            self.instrument.lock()
-            response = self.instrument.query(command)
-            self.instrument.unlock()
-            return response
+            with self._command_lock():
+                return self.instrument.query(command)
         except Exception as e:
             raise ValueError(e) # временное error propagation
 
-    def set_voltage(self, value: float):
+    def _write(self, command: str):
         """
-        Отправляет в прибор команду на установление напряжения, переданного в метод
+        Обёртка над отправкой SCPI комманд, не возвращающих ответа (установка параметров, переключение режимов)
         """
         try:
-            self._query(f'VOLTAGE {value}')
-            self.state["voltage"] = value
+            with self._command_lock():
+                self.instrument.write(command)
+        except Exception as e:
+            raise ValueError(e)
+
+    def _query_many(self, commands: list[str]) -> list[str]:
+        """
+        Выполняет несколько запросов подряд в рамках одной транзакции и возвращает ответы в порядке запросов
+        """
+        with self.transaction():
+            return [self._query(command) for command in commands]
+
+    def verify(self) -> bool:
+        """
+        Проверяет, что прибор выполнил все ранее отправленные команды (один запрос *OPC?)
+        """
+        try:
+            return self._query('*OPC?').strip('\x00').strip() == '1'
         except Exception:
-            pass
+            print(f'{self.name}: Operation complete query has failed')
+            return False
 
-    def set_current(self, value: float):
+    def apply_setpoints(self, voltage: float | None = None, current: float | None = None,
+                        power: float | None = None, verify: bool = True) -> bool:
         """
-        Отправляет в прибор команду на установление тока, переданного в метод
+        Отправляет группу уставок без ожидания ответов и, если требуется, подтверждает их выполнение
+        одним запросом *OPC?. Возвращает True, если все команды отправлены (и подтверждены)
         """
+        setpoints = {"voltage": (voltage, 'VOLTAGE'), "current": (current, 'CURRENT'), "power": (power, 'POWER')}
         try:
-            self._query(f'CURRENT {value}')
-            self.state["current"] = value
+            with self.transaction():
+                for key, (value, command) in setpoints.items():
+                    if value is not None:
+                        self._write(f'{command} {value}')
+                        self.state[key] = value
+                return self.verify() if verify else True
         except Exception:
-            pass
+            print(f'{self.name}: Cannot apply setpoints')
+            return False
+
+    def set_voltage(self, value: float):
+        """
+        Отправляет в прибор команду на установление напряжения, переданного в метод
+        """
+        return self.apply_setpoints(voltage=value, verify=self.verify_setpoints)
+
+    def set_current(self, value: float):
+        """
+        Отправляет в прибор команду на установление тока, переданного в метод
+        """
+        return self.apply_setpoints(current=value, verify=self.verify_setpoints)
 
     def set_power(self, value: float):
         """
         Отправляет в прибор команду на установление мощности, переданного в метод
         """
-        try:
-            self._query(f'POWER {value}')
-            self.state["power"] = value
-        except Exception:
-            pass
+        return self.apply_setpoints(power=value, verify=self.verify_setpoints)
 
     def get_voltage(self):
         """
@@ -115,6 +321,88 @@ class SCPIInstrument:
         else:
             return 0.0
 
+    def measure_all(self, quantities=("voltage", "current", "power")) -> dict:
+        """
+        Возвращает измеренные величины (напряжение, ток, мощность), считанные одним составным SCPI запросом.
+        Если прибор не поддерживает составные запросы, величины считываются отдельными запросами.
+        Опрос выполняется одной транзакцией: прибор блокируется один раз на все запросы опроса
+        """
+        self.last_read_ok = False
+        if not self.isInitialized:
+            return {quantity: 0.0 for quantity in quantities}
+        try:
+            with self.transaction():
+                return self._measure_all(quantities)
+        except Exception as e:
+            print(f'(!) {self.name}: measurement has failed: {e}')
+            return {quantity: 0.0 for quantity in quantities}
+
+    def _measure_all(self, quantities) -> dict:
+        if self.compound_supported is not False:
+            try:
+                response = self._query(';:'.join(self.MEASURE_COMMANDS[quantity] for quantity in quantities))
+                values = response.strip('\x00').strip().split(';')
+                if len(values) != len(quantities):
+                    raise ValueError(f'unexpected response "{response.strip()}"')
+                result = {quantity: round(float(value), 2) for quantity, value in zip(quantities, values)}
+                self.compound_supported = True
+                self.compound_failures = 0
+                self.last_read_ok = True
+                return result
+            except Exception as e:
+                # Сбой связи не означает, что прибор не поддерживает составные запросы: переход к отдельным
+                # запросам выполняется при явном отказе прибора (ошибка команды -1xx в очереди ошибок)
+                # или после COMPOUND_FAILURE_LIMIT неудач подряд, если составной запрос ещё ни разу не выполнялся
+                if self.compound_supported:
+                    return {quantity: 0.0 for quantity in quantities}
+                self.compound_failures += 1
+                if self._is_command_rejected():
+                    reason = 'rejected by the instrument'
+                elif self.compound_failures >= self.COMPOUND_FAILURE_LIMIT:
+                    reason = f'{self.compound_failures} failures in a row'
+                else:
+                    return {quantity: 0.0 for quantity in quantities}
+                self.compound_supported = False
+                print(f'(!) {self.name}: compound queries are not supported ({reason}), falling back to single queries: {e}')
+
+        try:
+            responses = self._query_many([self.MEASURE_COMMANDS[quantity] for quantity in quantities])
+        except Exception:
+            self._link_lost = True
+            return {quantity: 0.0 for quantity in quantities}
+        if self._link_lost:
+            # связь восстановлена: поддержка составных запросов проверяется со следующего опроса
+            self._link_lost = False
+            self.reset_compound_support()
+        result = {}
+        self.last_read_ok = True
+        for quantity, response in zip(quantities, responses):
+            try:
+                result[quantity] = round(float(response.strip('\x00')), 2)
+            except ValueError:
+                result[quantity] = 0.0
+                self.last_read_ok = False
+        return result
+
+    def _is_command_rejected(self) -> bool:
+        """
+        Проверяет очередь ошибок прибора: True, если последняя команда отклонена как ошибочная (коды -100...-199)
+        """
+        try:
+            code = int(self._query('SYSTEM:ERROR?').strip('\x00').split(',')[0])
+        except Exception:
+            return False
+        return -199 <= code <= -100
+
+    def reset_compound_support(self) -> None:
+        """
+        Возвращает к проверке составных запросов прибор, опрашиваемый отдельными запросами
+        (после переподключения причина отказа могла быть устранена или прибор заменён)
+        """
+        if self.compound_supported is False:
+            self.compound_supported = None
+            self.compound_failures = 0
+
     def get_identification(self):
         """
         Возвращает идентификацию прибора
@@ -129,30 +417,36 @@ class SCPIInstrument:
         Включает выход источника питания, передаёт состояние выхода прибора (0-выход отключен, 1-выход включен)
         """
         try:
-            self._query('OUTPUT ON')
+            self._write('OUTPUT ON')
             self.state["output"] = 1
+            return True
         except Exception:
             print(f'{self.name}: Cannot set output to on')
+            return False
 
     def set_output_off(self):
         """
         Выключает выход источника питания, передаёт состояние выхода прибора (0-выход отключен, 1-выход включен)
         """
         try:
-            self._query('OUTPUT OFF')
+            self._write('OUTPUT OFF')
             self.state["output"] = 0
+            return True
         except Exception:
             print(f'{self.name}: Cannot set output to off')
+            return False
 
     def set_mode_local(self):
         """
         Устанавливает прибор в состояние, при котором управление осуществляется с лицевой панели прибора
         """
         try:
-            self._query('SYSTEM:LOCAL')
+            self._write('SYSTEM:LOCAL')
             self.state["remote"] = 0
+            return True
         except Exception:
             print(f'{self.name}: Cannot set device to local mode')
+            return False
 
     def set_mode_remote(self):
         """
@@ -160,72 +454,311 @@ class SCPIInstrument:
         воспринимать команды со сторонних программ
         """
         try:
-            self._query('SYSTEM:REMOTE')
+            self._write('SYSTEM:REMOTE')
             self.state["remote"] = 1
+            return True
         except Exception:
             print(f'{self.name}: Cannot set device to remote mode')
+            return False
     
     def __del__(self):
-        self.instrument.close()
+        if self._session_locked:
+            try:
+                self.instrument.unlock()
+            except Exception:
+                pass
+        if self.instrument is not None:
+            self.instrument.close()
+
+
+class AsyncSCPIInstrument(SCPIInstrument):
+    """
+    Драйвер источника питания, обменивающийся SCPI командами напрямую через TCP сокет (asyncio streams)
+    без pyvisa и без фиксированной задержки query_delay. Команды и ответы разделяются символом перевода строки.
+    Несколько запросов отправляются одним пакетом (конвейером), а ответы читаются в порядке запросов.
+    Синхронные методы совпадают с SCPIInstrument, обмен выполняется в общем цикле событий AsyncLoopThread
+    """
+    DEFAULT_PORT = 5025  # стандартный порт SCPI-RAW
+
+    def __init__(self, ip: str, port: int, name: str, timeout: float = 1.0):
+        # блокировка VISA недоступна, обращения сериализуются io_lock
+        self._init_state(name, query_delay=0.0, lock_mode='none')
+        self.ip = ip
+        self.port = port or self.DEFAULT_PORT
+        self.timeout = timeout  # ограничение времени обмена, с
+        self.instrument = None
+        self.reader = None
+        self.writer = None
+        self._exchange_lock = None
+        self.runner = AsyncLoopThread.get()
+        try:
+            self.runner.run(self._connect_async(), timeout=self.timeout * 2)
+            print(f'(+) {self.name} initialized (asyncio): {self.get_identification()}')
+            self.isInitialized = True
+        except Exception as e:
+            print(f'(!) {self.name} failed to initialize:\t{e}')
+
+    async def _connect_async(self) -> None:
+        if self._exchange_lock is None:
+            # Примитивы asyncio создаются внутри работающего цикла событий
+            self._exchange_lock = asyncio.Lock()
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.ip, self.port), self.timeout)
+        self.reset_compound_support()
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _close_stream(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def exchange_async(self, commands: list[str], replies: int) -> list[str]:
+        """
+        Отправляет команды одним пакетом и читает заданное число строк ответа.
+        При ошибке соединение закрывается, чтобы ответы на прерванные запросы не попали в следующий обмен;
+        при следующем обращении соединение устанавливается заново
+        """
+        async with self._exchange_lock:
+            try:
+                if self.writer is None:
+                    await self._connect_async()
+                self.writer.write(''.join(f'{command}\n' for command in commands).encode('ascii'))
+                await self.writer.drain()
+                responses = []
+                for _ in range(replies):
+                    line = await asyncio.wait_for(self.reader.readuntil(b'\n'), self.timeout)
+                    responses.append(line.decode('ascii', errors='replace').rstrip('\r\n'))
+                return responses
+            except BaseException:
+                self._close_stream()
+                raise
+
+    async def query_async(self, command: str) -> str:
+        return (await self.exchange_async([command], 1))[0]
+
+    async def query_many_async(self, commands: list[str]) -> list[str]:
+        return await self.exchange_async(commands, len(commands))
+
+    async def write_async(self, command: str) -> None:
+        await self.exchange_async([command], 0)
+
+    def _run(self, coroutine):
+        return self.runner.run(coroutine, timeout=self.timeout * 2)
+
+    def _query(self, command: str):
+        try:
+            with self._command_lock():
+                return self._run(self.query_async(command))
+        except Exception as e:
+            raise ValueError(e)
+
+    def _query_many(self, commands: list[str]) -> list[str]:
+        """
+        Отправляет все запросы одним пакетом, не дожидаясь ответа на каждый из них
+        """
+        try:
+            with self._command_lock():
+                return self._run(self.query_many_async(commands))
+        except Exception as e:
+            raise ValueError(e)
+
+    def _write(self, command: str):
+        try:
+            with self._command_lock():
+                self._run(self.write_async(command))
+        except Exception as e:
+            raise ValueError(e)
+
+    def __del__(self):
+        if self.writer is not None:
+            self.runner.loop.call_soon_threadsafe(self._close_stream)
+
+
+_query_delays_lock = threading.Lock()
+
+
+def load_query_delays(path: str) -> dict[str, tuple[str, float]]:
+    """
+    Загружает сохранённые результаты калибровки задержек запросов (IP прибора -> (ответ на *IDN?, задержка, с)).
+    Записи в неизвестном формате пропускаются
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            entries = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    delays = {}
+    for ip, entry in entries.items() if isinstance(entries, dict) else ():
+        try:
+            delays[ip] = (str(entry["identification"]), float(entry["query_delay"]))
+        except (TypeError, KeyError, ValueError):
+            continue
+    return delays
+
+
+def save_query_delay(path: str, ip: str, identification: str, delay: float) -> None:
+    """
+    Сохраняет результат калибровки задержки запросов для прибора с указанным IP и ответом на *IDN?
+    """
+    with _query_delays_lock:
+        delays = load_query_delays(path)
+        delays[ip] = (identification, delay)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({ip: {"identification": idn, "query_delay": value} for ip, (idn, value) in delays.items()},
+                      file, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def create_scpi_instrument(rm, connection_type: str, ip: str, port: int, name: str,
+                           driver: str = 'visa', lock_mode: str = 'query', timeout: float = 1.0,
+                           query_delay: float | str = SCPIInstrument.DEFAULT_QUERY_DELAY,
+                           query_delay_file: str | None = None, verify_setpoints: bool = False) -> SCPIInstrument:
+    """
+    Создаёт драйвер источника питания, указанный в конфигурации
+    ("driver": "visa" - через pyvisa, "asyncio" - напрямую через TCP сокет; по умолчанию visa).
+    При query_delay="auto" задержка запросов калибруется после подключения. Если указан файл query_delay_file,
+    сохранённый в нём результат используется вместо повторной калибровки, но только для того же прибора
+    (совпадает ответ на *IDN?); новый результат записывается в файл.
+    При verify_setpoints=True каждая уставка подтверждается запросом *OPC? (по умолчанию уставки только отправляются)
+    """
+    instrument = _connect_scpi_instrument(rm, connection_type, ip, port, name, driver, lock_mode, timeout,
+                                          query_delay, query_delay_file)
+    instrument.verify_setpoints = verify_setpoints
+    return instrument
+
+
+def _connect_scpi_instrument(rm, connection_type: str, ip: str, port: int, name: str, driver: str, lock_mode: str,
+                             timeout: float, query_delay: float | str,
+                             query_delay_file: str | None) -> SCPIInstrument:
+    if driver == 'asyncio':
+        return AsyncSCPIInstrument(ip, port, name, timeout=timeout)
+    if query_delay != 'auto' or not query_delay_file:
+        return SCPIInstrument(rm, connection_type, ip, port, name, sleep_time=query_delay, lock_mode=lock_mode)
+
+    instrument = SCPIInstrument(rm, connection_type, ip, port, name, lock_mode=lock_mode)
+    if not instrument.isInitialized:
+        return instrument
+    cached = load_query_delays(query_delay_file).get(ip)
+    if cached is not None and cached[0] == instrument.identification:
+        instrument.set_query_delay(cached[1])
+        print(f'(+) {name}: query delay {instrument.query_delay * 1e3:.1f} ms (saved calibration)')
+        return instrument
+    instrument.calibrate_query_delay()
+    try:
+        save_query_delay(query_delay_file, ip, instrument.identification, instrument.query_delay)
+    except OSError as e:
+        print(f'(!) {name}: cannot save query delay: {e}')
+    return instrument
 
 
 class RRGInstrument:
     # TODO: РРГ сломался, затем нужно поменять конструкцию, чтобы флаг isInitialized устанавливался без ошибок
+    FLAG_REGISTER = 2               # регистр флагов
+    FLOW_REGISTER = 4               # регистр уставки/значения расхода на входе
+    # Биты 2 и 3 регистра флагов, задающие состояние клапана: 0 - открыт, 1 - закрыт, 2 - регулировка
+    STATE_MASK = 0b1100
+    STATE_BITS = {0: 0b0100, 1: 0b1000, 2: 0b0000}
+
     def __init__(self, config: dict):
+        self._init_state(config)
+        if config["method"] not in ("rtu", "socket"):
+            print("Unknown RRG connection method")
+            return
+        try:
+            self.isInitialized = bool(self._connect(config))
+        except Exception:
+            self.isInitialized = False
+        if self.isInitialized:
+            print("(+) RRG initialized")
+        else:
+            print("(!) RRG failed to initialize")
+
+    @classmethod
+    def offline(cls, config: dict) -> "RRGInstrument":
+        """
+        Создаёт неподключенный РРГ без обращения к Modbus (РРГ не подключился при запуске)
+        """
+        rrg = cls.__new__(cls)
+        rrg._init_state(config)
+        return rrg
+
+    def _init_state(self, config: dict) -> None:
         self.isInitialized = False
         self.client = None
         self.unit = config["unit"]
+        self.max_age = float(config.get("snapshot_max_age", 0.5))  # допустимый возраст снимка регистров, с
+        self.holding_registers = None  # снимок регистров хранения
+        self.registers_timestamp = 0.0  # время последней попытки считывания снимка (time.monotonic)
+        self.last_read_ok = False  # результат последнего обновления снимка
+        self.lock = threading.RLock()
+
+    def _connect(self, config: dict) -> bool:
+        """
+        Создаёт клиент Modbus и подключается к РРГ
+        """
         match config["method"]:
             case "rtu":
                 self.client = ModbusSerialClient(port=config["port"], baudrate=config["baudrate"])
             case "socket":
                 self.client = ModbusTcpClient(host=config["host"], port=config["port"], framer=FramerType.RTU)
-            case _:
-                print("Unknown RRG connection method")
-                return
-        if self.client.connect():
-            print("(+) RRG initialized")
-            self.isInitialized = True
-        else:
-            print("(!) RRG failed to initialize")
-            self.isInitialized = False
+        return self.client.connect()
 
     def __del__(self):
         if self.isInitialized:
             self.client.close()
 
-    def _get_holding_registers(self):
-        if self.isInitialized:
-            try:
-                rr = self.client.read_holding_registers(address=0, count=7, device_id=self.unit) 
-                self.holding_registers = rr.registers  # list of ints
-                self.flag_1 = bin(self.holding_registers[2])  # binary string
-                self.flag_1 = self.flag_1[::-1]  # reversed binary string
-                self.flag_1 = self.flag_1[:-2]   # reversed binary string without 0b
-                # преобразование строки в список целых чисел
-                self.flag_1_int = [int(self.flag_1[i]) for i in range(len(self.flag_1))]
+    def refresh(self) -> bool:
+        """
+        Считывает все регистры хранения одним запросом и сохраняет их снимок с меткой времени.
+        Вызывается один раз за цикл опроса, остальные методы используют сохранённый снимок.
+        При ошибке снимок сбрасывается, и до истечения max_age повторный запрос не выполняется
 
-            except Exception as e:
-                if self.isInitialized:
-                    print(f'(ERROR) RRG: Cannot get holding registers: {e}')
-        else:
+        Returns:
+            bool: True, если снимок успешно обновлён
+        """
+        if not self.isInitialized:
             print(f"[WARN]: RRG is not initialized")
+            return False
+        with self.lock:
+            self.registers_timestamp = time.monotonic()
+            try:
+                self.holding_registers = self._read_registers()  # list of ints
+                self.last_read_ok = True
+            except Exception as e:
+                self.holding_registers = None
+                self.last_read_ok = False
+                print(f'(ERROR) RRG: Cannot get holding registers: {e}')
+            return self.last_read_ok
+
+    def _read_registers(self) -> list[int]:
+        rr = self.client.read_holding_registers(address=0, count=7, device_id=self.unit)
+        if rr.isError():
+            raise ValueError(rr)
+        return list(rr.registers)
+
+    def _write_register(self, address: int, value: int) -> None:
+        self.client.write_register(address=address, value=value, device_id=self.unit)
+
+    def _get_holding_registers(self) -> list[int]:
+        """
+        Возвращает снимок регистров, обновляя его, только если он старше max_age
+        """
+        with self.lock:
+            if self.isInitialized and time.monotonic() - self.registers_timestamp > self.max_age:
+                self.refresh()
+            if self.holding_registers is None:
+                raise ValueError("holding registers are not available")
+            return self.holding_registers
 
     def get_state(self):
         result = int()
 
         try:
-            self._get_holding_registers()
-            bit_2 = self.flag_1_int[2]
-            bit_3 = self.flag_1_int[3]
-            if bit_2 == 1 and bit_3 == 0:
-                result = 0
-            if bit_2 == 0 and bit_3 == 1:
-                result = 1
-            if bit_2 == 0 and bit_3 == 0:
-                result = 2
-            if bit_2 == 1 and bit_3 == 1:
-                result = 0
+            bits = self._get_holding_registers()[self.FLAG_REGISTER] & self.STATE_MASK
+            # оба бита установлены - клапан открыт
+            result = 0 if bits == self.STATE_MASK else next(state for state, value in self.STATE_BITS.items() if value == bits)
 
         except Exception:
             if self.isInitialized:
@@ -236,10 +769,7 @@ class RRGInstrument:
 
     def get_flow_inlet(self):
         try:
-            self._get_holding_registers()
-            flow_inlet = self.holding_registers[4]
-            flow_outlet = self.holding_registers[5]
-            flow_outlet = bin(flow_outlet)
+            flow_inlet = self._get_holding_registers()[self.FLOW_REGISTER]
             flow_inlet = round(flow_inlet * 0.01, 2)
             return flow_inlet
         except Exception:
@@ -253,37 +783,88 @@ class RRGInstrument:
     def set_state(self, state):
         # 0 - открыт, 1 - закрыт, 2 - регулировка
         try:
-            self._get_holding_registers()
-            if state == 0:
-                self.flag_1_int[2] = 1
-                self.flag_1_int[3] = 0
-            if state == 1:
-                self.flag_1_int[2] = 0
-                self.flag_1_int[3] = 1
-            if state == 2:
-                self.flag_1_int[2] = 0
-                self.flag_1_int[3] = 0
-            self.flag_1_int = self.flag_1_int[::-1]
-            self.flag_1 = map(str, self.flag_1_int)
-            self.flag_1 = ''.join(self.flag_1)
-            self.flag_1 = int(self.flag_1, 2)
-            self.client.write_register(address=2, value=self.flag_1, device_id=self.unit) 
+            with self.lock:
+                registers = self._get_holding_registers()
+                flags = (registers[self.FLAG_REGISTER] & ~self.STATE_MASK) | self.STATE_BITS[state]
+                self._write_register(self.FLAG_REGISTER, flags)
+                registers[self.FLAG_REGISTER] = flags
+            return True
         except Exception as e:
             if self.isInitialized:
                 print(f'(ERROR) RRG: Set state has failed: reasone {e}')
+            return False
 
     def set_flow(self, value: int):
         try:
-            value_to_rrg = value * 100
-            self.client.write_register(address=4, value=value_to_rrg, device_id=self.unit) 
-            self._get_holding_registers()
-            return self.holding_registers[4]
+            value_to_rrg = int(round(value * 100))
+            with self.lock:
+                self._write_register(self.FLOW_REGISTER, value_to_rrg)
+                if self.holding_registers is not None:
+                    self.holding_registers[self.FLOW_REGISTER] = value_to_rrg
+            return value_to_rrg
         except Exception:
             if self.isInitialized:
                 print('(ERROR) RRG: Set flow has failed')
             return None
 
 
+class AsyncRRGInstrument(RRGInstrument):
+    """
+    Драйвер РРГ на асинхронных клиентах pymodbus. Обмен выполняется в общем цикле событий asyncio
+    с ограничением времени каждого запроса, поэтому медленный или отключенный РРГ задерживает
+    цикл опроса не более чем на timeout, а его обмен идёт параллельно с опросом остальных приборов.
+    Синхронные методы совпадают с RRGInstrument, асинхронные варианты доступны для использования внутри цикла событий
+    """
+    def __init__(self, config: dict):
+        self.timeout = float(config.get("timeout", 0.5))  # ограничение времени одного запроса, с
+        self.runner = AsyncLoopThread.get()
+        super().__init__(config)
+
+    def _connect(self, config: dict) -> bool:
+        return self.runner.run(self._connect_async(config), timeout=self.timeout * 4)
+
+    async def _connect_async(self, config: dict) -> bool:
+        # Асинхронные клиенты pymodbus создаются внутри работающего цикла событий
+        match config["method"]:
+            case "rtu":
+                self.client = AsyncModbusSerialClient(port=config["port"], baudrate=config["baudrate"],
+                                                      timeout=self.timeout, retries=0)
+            case "socket":
+                self.client = AsyncModbusTcpClient(host=config["host"], port=config["port"], framer=FramerType.RTU,
+                                                   timeout=self.timeout, retries=0)
+        return await self.client.connect()
+
+    def __del__(self):
+        if self.isInitialized:
+            self.runner.loop.call_soon_threadsafe(self.client.close)
+
+    async def read_registers_async(self) -> list[int]:
+        rr = await asyncio.wait_for(self.client.read_holding_registers(address=0, count=7, device_id=self.unit), self.timeout)
+        if rr.isError():
+            raise ValueError(rr)
+        return list(rr.registers)
+
+    async def write_register_async(self, address: int, value: int) -> None:
+        rr = await asyncio.wait_for(self.client.write_register(address=address, value=value, device_id=self.unit), self.timeout)
+        if rr.isError():
+            raise ValueError(rr)
+
+    def _read_registers(self) -> list[int]:
+        return self.runner.run(self.read_registers_async(), timeout=self.timeout * 2)
+
+    def _write_register(self, address: int, value: int) -> None:
+        self.runner.run(self.write_register_async(address, value), timeout=self.timeout * 2)
+
+
+def create_rrg_instrument(config: dict) -> RRGInstrument:
+    """
+    Создаёт драйвер РРГ, указанный в конфигурации ("driver": "sync" или "async", по умолчанию sync)
+    """
+    if config.get("driver", "sync") == "async":
+        return AsyncRRGInstrument(config)
+    return RRGInstrument(config)
+
+
 class NIDAQInstrument:
     def __init__(self,
                  path,
@@ -294,13 +875,15 @@ class NIDAQInstrument:
                  thermal_unit='C',
                  high_speed_adc=True,
                  sleep_time=0,
-                 cjc='default'):
+                 cjc='default',
+                 connect=True):
         self.path = path
         self.name = name
         self.thermocouple_ch_start = thermocouple_ch_start
         self.thermocouple_ch_end = thermocouple_ch_end
         self.sleep_time = sleep_time
         self.cjc = cjc
+        self.last_read_ok = False  # результат последнего считывания термопар
 
         if thermocouple_type == 'K':
             self.thermocouple_type = constants.ThermocoupleType.K
@@ -322,6 +905,11 @@ class NIDAQInstrument:
             self.thermal_unit = constants.TemperatureUnits.DEG_C
         if thermal_unit == 'K':
             self.thermal_unit = constants.TemperatureUnits.K 
+        if not connect:
+            # неподключенный прибор (например, устройство не ответило при запуске): считывание возвращает нули
+            self.task = None
+            self.isInitialized = False
+            return
         try:
             self.task = Task()
             self.isInitialized = True
@@ -331,6 +919,13 @@ class NIDAQInstrument:
             print(f'Thermocouple does not initialized')
             self.isInitialized = False
 
+    @classmethod
+    def offline(cls, path, name, thermocouple_ch_start, thermocouple_ch_end=0) -> "NIDAQInstrument":
+        """
+        Создаёт неподключенный модуль термопар без создания задачи NI-DAQmx (модуль не подключился при запуске)
+        """
+        return cls(path, name, thermocouple_ch_start, thermocouple_ch_end, connect=False)
+
     def create_single_thermocouple(self):
         try:
             self.task.ai_channels.add_ai_thrmcpl_chan(
@@ -356,200 +951,511 @@ class NIDAQInstrument:
     def read_thermocouple(self):
         try:
             value = self.task.read()
+            self.last_read_ok = True
             return value
         except Exception:
+            self.last_read_ok = False
             return [0.0 for i in range(self.thermocouple_ch_end - self.thermocouple_ch_start + 1)]
     
     def __del__(self):
-        self.task.close() 
+        if getattr(self, 'task', None) is not None:
+            self.task.close() 
+
+class ERSTEVAKFrame(NamedTuple):
+    """
+    Кадр ответа вакуумметра ЭРСТЕВАК: адрес, эхо команды и данные
+    """
+    address: int
+    command: int
+    data: bytes
+
+
+def erstevak_checksum(body: bytes) -> int:
+    """
+    Контрольная сумма кадра ЭРСТЕВАК: сумма байтов по модулю 64, смещённая на 64
+    """
+    return sum(body) % 64 + 64
+
+
+def _decode_digits(data: bytes, start: int, stop: int) -> int:
+    """
+    Переводит ASCII-цифры data[start:stop] в целое число без создания промежуточных строк
+    """
+    value = 0
+    for i in range(start, stop):
+        digit = data[i] - 48
+        if not 0 <= digit <= 9:
+            raise ValueError(f"Vacuumeter: non-digit byte {data[i]} in frame")
+        value = value * 10 + digit
+    return value
+
+
+def parse_erstevak_frames(buffer: bytes) -> tuple[list[ERSTEVAKFrame], bytes]:
+    """
+    Разбирает за один проход буфер, содержащий один или несколько кадров, завершённых символом '\\r'.
+    Кадры с неверной контрольной суммой, адресом или длиной отбрасываются
+
+    Returns:
+        tuple: список корректных кадров и остаток буфера после последнего полного кадра
+    """
+    frames = []
+    start = 0
+    while (end := buffer.find(b'\r', start)) != -1:
+        # адрес (3) + команда (1) + контрольная сумма (1)
+        if end - start >= 5 and buffer[end - 1] == erstevak_checksum(buffer[start:end - 1]):
+            try:
+                frames.append(ERSTEVAKFrame(_decode_digits(buffer, start, start + 3), buffer[start + 3], buffer[start + 4:end - 1]))
+            except ValueError:
+                pass
+        start = end + 1
+    return frames, buffer[start:]
+
+
+def decode_erstevak_pressure(data: bytes) -> float:
+    """
+    Переводит данные ответа на команду M (4 цифры мантиссы и 2 цифры порядка) в давление, Торр
+    """
+    if len(data) != 6:
+        raise ValueError(f"Vacuumeter: invalid pressure data {data}")
+    mantissa = _decode_digits(data, 0, 4) / 1000
+    exponent = _decode_digits(data, 4, 6) - 20
+    return mantissa * 10 ** exponent * 0.75  # torr
+
+
+class ERSTEVAKConnection:
+    """
+    Постоянное TCP-соединение со шлюзом вакуумметров ЭРСТЕВАК.
+    Один объект обслуживает все вакуумметры, подключенные к шлюзу (ip, port): запросы к ним
+    сериализуются, а при потере связи соединение переустанавливается автоматически.
+    Шлюз передаёт запросы на линию RS-485, поэтому по умолчанию следующий запрос отправляется только
+    после ответа на предыдущий; отправка нескольких запросов одним пакетом (pipelined) включается
+    только для шлюзов, которые сами ставят запросы в очередь
+    """
+    _connections = {}                   # открытые соединения: (класс, канал связи) -> соединение
+    _connections_lock = threading.Lock()
+
+    def __init__(self, ip: str, port: int, timeout: float = 1.0, pipelined: bool = False):
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.half_duplex = not pipelined  # запросы к разным вакуумметрам нельзя отправлять одним пакетом
+        self.lock = threading.RLock()   # сериализация обмена со шлюзом
+        self.latency = {}               # время ответа последнего запроса по адресам вакуумметров, с
+        self._transport = None
+
+    @classmethod
+    def get(cls, *endpoint, **kwargs) -> "ERSTEVAKConnection":
+        """
+        Возвращает общее соединение для канала связи, создавая его при первом обращении
+        """
+        with cls._connections_lock:
+            if (cls, endpoint) not in cls._connections:
+                cls._connections[(cls, endpoint)] = cls(*endpoint, **kwargs)
+            return cls._connections[(cls, endpoint)]
+
+    @property
+    def isOpen(self) -> bool:
+        return self._transport is not None
+
+    def open(self) -> None:
+        """
+        Устанавливает соединение, если оно ещё не установлено
+        """
+        with self.lock:
+            if self._transport is None:
+                self._transport = self._connect()
+
+    def close(self) -> None:
+        with self.lock:
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
+
+    def send(self, command: bytes) -> None:
+        """
+        Отправляет команду, не ожидая ответа
+        """
+        with self.lock:
+            self._exchange(lambda: self._write(command))
+
+    def request(self, requests: list[tuple[int, bytes]]) -> list[bytes | None]:
+        """
+        Отправляет запросы к нескольким вакуумметрам (одним пакетом, если шлюз поддерживает конвейерную отправку)
+        и считывает ответы в порядке запросов
+
+        Parameters:
+            requests (list): пары (адрес вакуумметра, команда)
+
+        Returns:
+            list: кадры ответов (None для запросов, ответ на которые не получен)
+        """
+        with self.lock:
+            return self._exchange(lambda: self._pipeline(requests))
+
+    def _exchange(self, operation: Callable):
+        """
+        Выполняет операцию обмена; при разрыве соединения переподключается и повторяет её один раз
+        """
+        for attempt in range(2):
+            try:
+                self.open()
+                return operation()
+            except TimeoutError:
+                raise
+            except (OSError, serial.SerialException):
+                self.close()
+                if attempt:
+                    raise
+
+    def _pipeline(self, requests: list[tuple[int, bytes]]) -> list[bytes | None]:
+        if self.half_duplex:
+            # Линия RS-485 полудуплексная: следующий запрос отправляется только после ответа на предыдущий
+            responses = []
+            for address, command in requests:
+                self._discard_input()
+                start = time.perf_counter()
+                self._write(command)
+                frame = next(self._read_frames(1), None)
+                if frame is not None:
+                    self.latency[address] = time.perf_counter() - start
+                responses.append(frame)
+            return responses
+
+        self._discard_input()
+        start = time.perf_counter()
+        self._write(b''.join(command for _, command in requests))
+        responses = []
+        for frame in self._read_frames(len(requests)):
+            for parsed in parse_erstevak_frames(frame)[0]:
+                self.latency[parsed.address] = time.perf_counter() - start
+            responses.append(frame)
+        return responses + [None] * (len(requests) - len(responses))
+
+    # ------------------------------ Транспорт: TCP-сокет ------------------------------
+
+    def _connect(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        try:
+            s.connect((self.ip, self.port))
+        except OSError:
+            s.close()
+            raise
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return s
+
+    def _write(self, data: bytes) -> None:
+        self._transport.sendall(data)
+
+    def _discard_input(self) -> None:
+        """
+        Удаляет из буфера приёма данные, оставшиеся от предыдущих обменов (например, запоздавшие ответы)
+        """
+        self._transport.setblocking(False)
+        try:
+            while self._transport.recv(1024):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        finally:
+            self._transport.settimeout(self.timeout)
+
+    def _read_frames(self, count: int):
+        """
+        Считывает до count кадров, завершённых символом '\\r', пока не истечёт таймаут
+        """
+        buffer = b''
+        received = 0
+        try:
+            while received < count:
+                chunk = self._transport.recv(1024)
+                if not chunk:
+                    raise ConnectionResetError("connection closed by the gateway")
+                buffer += chunk
+                *frames, buffer = buffer.split(b'\r')
+                for frame in frames[:count - received]:
+                    received += 1
+                    yield frame + b'\r'
+        except TimeoutError:
+            return
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(ip={self.ip}, port={self.port})"
+
+
+class ERSTEVAKSerialConnection(ERSTEVAKConnection):
+    """
+    Постоянное соединение с вакуумметрами ЭРСТЕВАК через COM-порт.
+    Порт остаётся открытым между опросами, а ответ считывается до символа конца кадра '\\r',
+    поэтому время опроса определяется временем ответа прибора, а не таймаутом порта
+    """
+    def __init__(self, com_port: str, baudrate: int, timeout: float = 0.5, inter_byte_timeout: float = 0.02):
+        super().__init__(com_port, baudrate, timeout)
+        self.inter_byte_timeout = inter_byte_timeout
+
+    def _connect(self):
+        return serial.Serial(port=self.ip, baudrate=self.port, timeout=self.timeout,
+                             inter_byte_timeout=self.inter_byte_timeout)
+
+    def _write(self, data: bytes) -> None:
+        self._transport.write(data)
+
+    def _discard_input(self) -> None:
+        self._transport.reset_input_buffer()
+
+    def _read_frames(self, count: int):
+        for _ in range(count):
+            frame = self._transport.read_until(b'\r')
+            if not frame.endswith(b'\r'):
+                return  # кадр не получен целиком за отведённое время
+            yield frame
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(com_port={self.ip}, baudrate={self.port})"
+
 
 class VacuumeterERSTEVAK:
+    # Команды выбора поправочного коэффициента на род газа
+    GAS_CODES = {
+        "Аргон": "c000160",
+        "Гелий": "c000100",
+        "Воздух": "c000100"
+    }
+    # Каналы, для которых устанавливается род газа, в зависимости от типа вакуумметра
+    GAS_CHANNELS = {
+        "pirani": ("c1",),
+        "ionization": ("c1", "c2")
+    }
+    GAS_COMMAND_INTERVAL = 0.2  # пауза между командами установки рода газа, с
+
     def __init__(self, config: dict):
-        self.config = config
-        self.isInitialized = False
-        self.address = self.config["address"]
+        self._init_state(config)
         try:
             match self.config["method"]:
                 case "socket":
-                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    s.settimeout(1)
-                    s.connect((self.config["ip"], self.config["port"]))
-                    s.close()
+                    self.connection = ERSTEVAKConnection.get(self.config["ip"], self.config["port"],
+                                                             pipelined=bool(int(self.config.get("pipelined", 0))))
+                    self.connection.open()
                     print("(+) Vacuumeter reader initialized")
                     self.isInitialized = True
                 case "serial":
-                    s = serial.Serial(port=self.config["com_port"], baudrate=self.config["baudrate"], timeout=1.0)
-                    s.close()
+                    self.connection = ERSTEVAKSerialConnection.get(self.config["com_port"], self.config["baudrate"])
+                    self.connection.open()
                     print("(+) Vacuumeter reader initialized")
                     self.isInitialized = True
                 case _: 
                     print(f"(!) This connection method {self.config['method']} does not exists")
-        except OSError as e:
+        except (OSError, serial.SerialException) as e:
             print("(!) Failed to initialize Vacuumeter reader:\t", e)
+
+    @classmethod
+    def offline(cls, config: dict) -> "VacuumeterERSTEVAK":
+        """
+        Создаёт неподключенный вакуумметр без открытия соединения (вакуумметр не подключился при запуске)
+        """
+        gauge = cls.__new__(cls)
+        gauge._init_state(config)
+        return gauge
+
+    def _init_state(self, config: dict) -> None:
+        self.config = config
+        self.isInitialized = False
+        self.address = self.config["address"]
+        self.connection = None
+        self.last_read_ok = False  # результат последнего считывания давления
+        # подтверждать команды установки рода газа ответом вакуумметра (по умолчанию команды только отправляются)
+        self.confirm_gas = bool(int(self.config.get("confirm_gas", 0)))
+
+    @property
+    def endpoint(self) -> tuple:
+        """
+        Возвращает идентификатор канала связи (шлюз или COM-порт), через который опрашивается вакуумметр
+        """
+        match self.config["method"]:
+            case "socket":
+                return ("socket", self.config["ip"], self.config["port"])
+            case "serial":
+                return ("serial", self.config["com_port"])
+            case _:
+                return (self.config["method"], self.address)
+
+    @property
+    def latency(self) -> float | None:
+        """
+        Время ответа вакуумметра на последний запрос, с
+        """
+        return self.connection.latency.get(self.address) if self.connection is not None else None
+
+    @staticmethod
+    def parse_pressure(data: bytes, address: int) -> float:
+        """
+        Переводит ответ на команду M в давление, Торр, проверяя контрольную сумму, адрес и эхо команды
+        """
+        frames = parse_erstevak_frames(data)[0] if data is not None else []
+        if len(frames) != 1 or frames[0].address != address or frames[0].command != ord('M'):
+            raise ValueError(f"Vacuumeter {address}: invalid response frame {data}")
+        return decode_erstevak_pressure(frames[0].data)
+
+    @classmethod
+    def read_many(cls, gauges: list) -> list[float]:
+        """
+        Считывает давление с нескольких вакуумметров. Запросы к вакуумметрам, подключенным
+        к одному шлюзу, отправляются одним обменом через общее соединение, а ответы
+        сопоставляются с вакуумметрами по адресу в кадре
+        """
+        values = [0] * len(gauges)
+        pipelined = {}
+        for gauge in gauges:
+            gauge.last_read_ok = False
+        for i, gauge in enumerate(gauges):
+            if gauge.isInitialized and gauge.connection is not None:
+                pipelined.setdefault(gauge.connection, []).append(i)
+            else:
+                values[i] = gauge.return_value()
+        for connection, indexes in pipelined.items():
+            try:
+                responses = connection.request([(gauges[i].address, gauges[i].ERSTVAK_command(gauges[i].address, 'M')) for i in indexes])
+            except Exception as e:
+                print(e)
+                continue
+            frames = parse_erstevak_frames(b''.join(response for response in responses if response is not None))[0]
+            pressures = {}
+            for frame in frames:
+                if frame.command == ord('M'):
+                    try:
+                        pressures[frame.address] = decode_erstevak_pressure(frame.data)
+                    except ValueError as e:
+                        print(e)
+            for i in indexes:
+                if gauges[i].address in pressures:
+                    values[i] = pressures[gauges[i].address]
+                    gauges[i].last_read_ok = True
+                else:
+                    print(f"Vacuumeter {gauges[i].address}: no valid response")
+        return values
         
     def return_value(self):
         data = 0 
+        self.last_read_ok = False
         if self.isInitialized:
             try:
-                match self.config["method"]:
-                    case "socket":
-                        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                            s.settimeout(1)
-                            s.connect((self.config["ip"], self.config["port"]))
-                            s.send(self.ERSTVAK_command(self.config["address"], 'M'))
-                            data = s.recv(1024).decode('ascii')
-                            mantissa = int(data[4:8]) / 1000
-                            exponent = int(data[8:10]) - 20
-                            data = mantissa * 10 ** exponent * 0.75  # torr
-                    case "serial":
-                        with serial.Serial(port=self.config["com_port"], baudrate=self.config["baudrate"], timeout=1.0) as s:
-                            s.write(self.ERSTVAK_command(self.config["address"], 'M'))
-                            data = s.readall().decode('ascii')
-                            mantissa = int(data[4:8]) / 1000
-                            exponent = int(data[8:10]) - 20
-                            data = mantissa * 10 ** exponent * 0.75  # torr
-                    case _:
-                        data = 0
+                response = self.connection.request([(self.address, self.ERSTVAK_command(self.address, 'M'))])[0]
+                data = self.parse_pressure(response, self.address)
+                self.last_read_ok = True
             except Exception as e:
                 print(e)
                 data = 0
         return data
 
-    def set_gas(self, gas: str):
-        Ar = "c000160"
-        He = "c000100"
-        N2 = "c000100"
-        sleep_time = 0.2
-        if self.isInitialized:
+    def gas_commands(self, gas: str) -> list[bytes]:
+        """
+        Возвращает последовательность команд, устанавливающих род газа для вакуумметра
+        """
+        if self.config["type"] not in self.GAS_CHANNELS:
+            print(f"Vacuumeter type {self.config['type']} not found, gas {gas} ")
+            return []
+        if gas not in self.GAS_CODES:
+            return []
+        commands = []
+        for channel in self.GAS_CHANNELS[self.config["type"]]:
+            commands.append(self.ERSTVAK_command(self.address, channel))
+            commands.append(self.ERSTVAK_command(self.address, self.GAS_CODES[gas]))
+        return commands
+
+    def set_gas(self, gas: str) -> bool:
+        """
+        Устанавливает род газа, ожидая завершения последовательности команд
+        """
+        return AsyncLoopThread.get().run(self.set_gas_many_async([self], gas))[0]
+
+    @classmethod
+    async def set_gas_many_async(cls, gauges: list, gas: str, interval: float = GAS_COMMAND_INTERVAL,
+                                 callback: Callable[[int, bool], None] | None = None) -> list[bool]:
+        """
+        Устанавливает род газа для нескольких вакуумметров, не блокируя потоки на время пауз между командами.
+        Паузы выдерживаются в цикле событий (asyncio.sleep), поэтому между командами общее соединение
+        со шлюзом остаётся доступным для опроса давления. Очередные команды вакуумметров одного шлюза
+        отправляются одним обменом, последовательности для разных каналов связи выполняются параллельно.
+        По умолчанию команды только отправляются; для вакуумметров с параметром confirm_gas установка
+        считается выполненной, только если вакуумметр подтвердил ответом каждую команду
+
+        Parameters:
+            gauges (list): вакуумметры
+            gas (str): род газа (ключ GAS_CODES)
+            interval (float): пауза между командами, с
+            callback (Callable): вызывается с индексом вакуумметра и результатом сразу после завершения его последовательности
+
+        Returns:
+            list: результат установки для каждого вакуумметра
+        """
+        results = [False] * len(gauges)
+
+        def finish(index: int, ok: bool) -> None:
+            results[index] = ok
+            if callback is not None:
+                callback(index, ok)
+
+        sequences = {}
+        for i, gauge in enumerate(gauges):
+            commands = gauge.gas_commands(gas) if gauge.isInitialized and gauge.connection is not None else []
+            if commands:
+                sequences.setdefault(gauge.connection, []).append((i, gauge.address, commands, gauge.confirm_gas))
+            else:
+                finish(i, False)
+        await asyncio.gather(*(cls._send_gas_sequence(connection, members, interval, finish)
+                               for connection, members in sequences.items()))
+        return results
+
+    @staticmethod
+    async def _send_gas_sequence(connection: ERSTEVAKConnection, members: list[tuple[int, int, list[bytes], bool]],
+                                 interval: float, finish: Callable[[int, bool], None]) -> None:
+        # Шаги последовательности: команды (индекс вакуумметра, адрес, команда, подтверждение), отправляемые
+        # одним обменом. Команды вакуумметров с подтверждением отправляются запросом, и ответ должен содержать
+        # адрес вакуумметра и эхо команды; вакуумметр, не подтвердивший команду, исключается из следующих шагов,
+        # а установка рода газа для него не удалась. Остальные команды только отправляются
+        if connection.half_duplex:
+            steps = [[(i, address, command, confirm)] for i, address, commands, confirm in members for command in commands]
+        else:
+            steps = [[(i, address, commands[k], confirm) for i, address, commands, confirm in members if k < len(commands)]
+                     for k in range(max(len(commands) for _, _, commands, _ in members))]
+        last_step = {i: n for n, step in enumerate(steps) for i, _, _, _ in step}
+
+        loop = asyncio.get_running_loop()
+        pending = {i for i, _, _, _ in members}
+        first = True
+        for n, step in enumerate(steps):
+            step = [entry for entry in step if entry[0] in pending]
+            if not step:
+                continue
+            if not first:
+                await asyncio.sleep(interval)
+            first = False
+            requests = [(address, command) for _, address, command, confirm in step if confirm]
+            writes = b''.join(command for _, _, command, confirm in step if not confirm)
             try:
-                match self.config["method"]:
-                    case "socket":
-                        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                            s.settimeout(1)
-                            s.connect((self.config["ip"], self.config["port"]))
-                            match gas:
-                                case "Аргон":
-                                    print(gas)
-                                    match self.config["type"]:
-                                        case "pirani": 
-                                            s.sendall(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, Ar))
-                                            time.sleep(sleep_time)
-                                        case "ionization":
-                                            s.sendall(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, Ar))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, "c2"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, Ar))
-                                            time.sleep(sleep_time)
-                                        case _:
-                                            print(f"Vacuumeter type {self.config['type']} not found, gas Ar ")
-                                case "Гелий": 
-                                    match self.config["type"]:
-                                        case "pirani":
-                                            s.sendall(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, He))
-                                            time.sleep(sleep_time)
-                                        case "ionization":
-                                            s.sendall(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, He))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, "c2"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, He))
-                                            time.sleep(sleep_time)
-                                        case _:
-                                            print(f"Vacuumeter type {self.config['type']} not found, gas He ")
-                                case "Воздух": 
-                                    match self.config["type"]:
-                                        case "pirani":
-                                            s.sendall(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, N2))
-                                            time.sleep(sleep_time)
-                                        case "ionization":
-                                            s.sendall(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, N2))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, "c2"))
-                                            time.sleep(sleep_time)
-                                            s.sendall(self.ERSTVAK_command(self.address, N2))
-                                            time.sleep(sleep_time)
-                                        case _:
-                                            print(f"Vacuumeter type {self.config['type']} not found, gas N2 ")
-                    case "serial":
-                        with serial.Serial(port=self.config["com_port"], baudrate=self.config["baudrate"], timeout=1.0) as s:
-                            match gas:
-                                case "Аргон":
-                                    match self.config["type"]:
-                                        case "pirani": 
-                                            s.write(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, Ar))
-                                            time.sleep(sleep_time)
-                                        case "ionization":
-                                            s.write(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, Ar))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, "c2"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, Ar))
-                                            time.sleep(sleep_time)
-                                        case _:
-                                            pass
-                                case "Гелий": 
-                                    match self.config["type"]:
-                                        case "pirani":
-                                            s.write(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, He))
-                                            time.sleep(sleep_time)
-                                        case "ionization":
-                                            s.write(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, He))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, "c2"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, He))
-                                            time.sleep(sleep_time)
-                                        case _:
-                                            pass
-                                case "Воздух": 
-                                    match self.config["type"]:
-                                        case "pirani":
-                                            s.write(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, N2))
-                                            time.sleep(sleep_time)
-                                        case "ionization":
-                                            s.write(self.ERSTVAK_command(self.address, "c1"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, N2))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, "c2"))
-                                            time.sleep(sleep_time)
-                                            s.write(self.ERSTVAK_command(self.address, N2))
-                                            time.sleep(sleep_time)
-                                        case _:
-                                            pass
+                # блокирующий обмен выполняется вне цикла событий и занимает соединение только на время обмена;
+                # ответы на команды без подтверждения, если они есть, отбрасываются перед следующим запросом
+                responses = await loop.run_in_executor(None, connection.request, requests) if requests else []
+                if writes:
+                    await loop.run_in_executor(None, connection.send, writes)
             except Exception as e:
-                print(e)
+                print(f"(!) {connection}: gas switching has failed: {e}")
+                for i in sorted(pending):
+                    finish(i, False)
                 return
+            frames = parse_erstevak_frames(b''.join(response for response in responses if response is not None))[0]
+            confirmed = {(frame.address, frame.command) for frame in frames}
+            for i, address, command, confirm in step:
+                if confirm and (address, command[3]) not in confirmed:
+                    print(f"(!) Vacuumeter {address}: gas command {command} is not confirmed")
+                    pending.discard(i)
+                    finish(i, False)
+                elif n == last_step[i]:
+                    pending.discard(i)
+                    finish(i, True)
 
     def ERSTVAK_CRC64(self, command_full):
-        crc = 0
-        for ch in command_full:
-            crc += ch
-        crc = (crc % 64) + 64
-        return bytes(chr(crc), 'ascii')
+        return bytes([erstevak_checksum(command_full)])
 
     def ERSTVAK_command(self, addr, cmd):
         command = "{0:03d}{1:1s}".format(addr, cmd).encode('ascii')
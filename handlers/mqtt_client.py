@@ -1,4 +1,9 @@
 from typing import Callable, Optional
+from collections import deque
+import threading
+import struct
+import json
+import math
 from numpy import isin
 from paho.mqtt import client as mqtt_client
 
@@ -152,6 +157,15 @@ class MQTTProducer:
         self.__id       : str | None = None                  # ID клиента
         self.__client   : mqtt_client.Client | None = None   # экземпялр клиента
         self.__isInited : bool = False                       # флаг инициализации  
+        self.__isStarted: bool = False                       # флаг запуска сетевого потока клиента
+        self.__queue    : deque = deque(maxlen=1000)         # очередь сообщений, ожидающих отправки
+        self.__lock     : threading.RLock = threading.RLock()  # блокировка очереди
+        self.__window   : int = 20                           # наибольшее число сообщений, переданных клиенту paho и ещё не отправленных
+        self.__handed   : int = 0                            # сообщения, переданные клиенту paho и ещё не отправленные
+        self.dropped    : int = 0                            # количество сообщений, вытесненных из очереди
+        self.mode       : str = "topics"                     # режим публикации: topics, frame или both
+        self.frame_format: str = "json"                      # формат кадра: json или binary
+        self.__schema   : list | None = None                 # список каналов последней опубликованной схемы кадра
 
         if isinstance(configs, dict): self.configure(configs)
 
@@ -171,6 +185,10 @@ class MQTTProducer:
     def port(self) -> int: 
         return self.__port
 
+    @property
+    def pending(self) -> int: 
+        return len(self.__queue) + self.__handed
+
     def configure(self, configs: dict) -> bool:
         """
         Настротить объект MQTTProducer
@@ -196,27 +214,49 @@ class MQTTProducer:
             self.__isInited = False
             print(f"[!] Failed to configure the device's basic operating parameters: missing {error}")
 
+        # Конфигурирование оставшихся параметров
+        if self.__isInited:
+            # Ограничение queue_size распространяется на все неотправленные сообщения:
+            # не более max_inflight из них передаются клиенту paho, остальные ждут в очереди
+            queue_size    = int(configs["queue_size"]) if "queue_size" in configs else 1000
+            self.__window = max(min(int(configs["max_inflight"]) if "max_inflight" in configs else 20, queue_size - 1), 1)
+            self.__queue  = deque(maxlen = max(queue_size - self.__window, 1))
+            self.__client.max_inflight_messages_set(self.__window)
+            self.__client.max_queued_messages_set(self.__window)
+            self.__client.reconnect_delay_set(
+                min_delay = configs["reconnect_min_delay"] if "reconnect_min_delay" in configs else 1,
+                max_delay = configs["reconnect_max_delay"] if "reconnect_max_delay" in configs else 30
+            )
+            self.__client.on_connect    = self.__on_connect
+            self.__client.on_disconnect = self.__on_disconnect
+            self.__client.on_publish    = self.__on_publish
+            self.mode         = configs["mode"] if "mode" in configs else "topics"
+            self.frame_format = configs["frame_format"] if "frame_format" in configs else "json"
+
         return self.__isInited
 
     def connect(self) -> bool:
         """ 
-        Подключиться к MQTT брокеру (без аутентификации)
+        Подключиться к MQTT брокеру (без аутентификации).
+        Соединение устанавливается и поддерживается сетевым потоком клиента,
+        который автоматически переподключается к брокеру при потере связи
 
         Returns:
-            bool: True, если клиент успешно подключен к брокеру
+            bool: True, если сетевой поток клиента запущен
         """
 
         if self.__isInited:
-            if self.isOnline: self.disconnect()
+            if self.__isStarted: return True
             try:
-                self.__client.connect(self.__broker, self.__port)
+                self.__client.connect_async(self.__broker, self.__port)
                 self.__client.loop_start()
+                self.__isStarted = True
             except Exception as e:
                 print(f"[!] Failed to connect to the MQTT Broker: {e}")
         else:
             print("[!] Failed to connect to the MQTT Broker: device is not configurated")
 
-        return self.isOnline
+        return self.__isStarted
     
     def disconnect(self) -> bool:
         """
@@ -226,35 +266,156 @@ class MQTTProducer:
             bool: True, если успешно отключено (или уже отключено)
         """
 
-        if self.isOnline:
-            self.__client.loop_stop()  # Останавливаем внутренний цикл выборки сообщений
-            self.__client.disconnect() # Отключаемся от брокера
+        if self.__isStarted:
+            self.__flush()                     # Передаём клиенту накопленные сообщения
+            self.__client.disconnect()         # Отключаемся от брокера
+            self.__client.loop_stop()          # Останавливаем сетевой поток клиента
+            self.__isStarted = False
 
         return not self.isOnline    
 
     def publish(self, data: float, topic: str) -> bool:
         """
-        Опубликовать данные в указанный топик
+        Поставить данные в очередь на публикацию в указанный топик.
+        Метод не блокируется: сообщения отправляет сетевой поток клиента, а пока соединения нет,
+        они накапливаются в ограниченной очереди (при переполнении вытесняются самые старые)
 
         Parameters:
             data (float): Данные для публикации
             topic (str): Топик в который публикуется сообщение
 
         Returns:
-            bool: True если публикация прошла успешно
+            bool: True если сообщение поставлено в очередь
         """
 
-        if self.isOnline:
-            try:
-                # Формируем полный топик и публикуем данные
-                self.__client.publish(f"{self.__id}/{topic}", f"{data}")
-                return True
-            except Exception as e:
-                print(f"[!] Failed to publish the message with topic '{self.__id}/{topic}': {e}")
-                return False
+        return self.__enqueue(f"{self.__id}/{topic}", f"{data}")
+
+    def publish_frame(self, timestamp: float, instruments: dict, thermocouples: dict) -> bool:
+        """
+        Опубликовать все данные цикла одним сообщением в топик '{id}/frame'.
+        Кадр содержит метку времени и значения каналов в порядке, описанном схемой, которая
+        публикуется (с флагом retain) в топик '{id}/frame/schema' при каждом изменении состава каналов.
+        Состав каналов цикла постоянен, а каналы, не опрошенные в цикле, передаются как NaN,
+        поэтому схема публикуется только при подключении и изменении конфигурации.
+        В формате json кадр - это массив [timestamp, v1, v2, ...] (NaN - null), в формате binary - упакованные
+        числа float64 в порядке little-endian
+
+        Parameters:
+            timestamp (float): метка времени цикла
+            instruments (dict): значения каналов приборов
+            thermocouples (dict): значения термопар
+
+        Returns:
+            bool: True если кадр поставлен в очередь
+        """
+
+        channels = [f"instruments/{name}" for name in instruments] + [f"thermocouples/{name}" for name in thermocouples]
+        values   = [timestamp, *instruments.values(), *thermocouples.values()]
+
+        if channels != self.__schema:
+            schema = {
+                "fields": ["timestamp", *channels],
+                "format": self.frame_format,
+                "layout": f"<{len(values)}d" if self.frame_format == "binary" else None
+            }
+            if not self.__enqueue(f"{self.__id}/frame/schema", json.dumps(schema), retain=True): return False
+            self.__schema = channels
+
+        if self.frame_format == "binary":
+            payload = struct.pack(f"<{len(values)}d", *[self.__to_float(value) for value in values])
         else:
+            payload = json.dumps([None if isinstance(value, float) and math.isnan(value) else value for value in values],
+                                 separators=(",", ":"))
+        return self.__enqueue(f"{self.__id}/frame", payload)
+
+    def publish_cycle(self, timestamp: float, instruments: dict, thermocouples: dict) -> None:
+        """
+        Опубликовать данные цикла в соответствии с режимом публикации:
+        topics - каждый канал в собственный топик (каналы, не опрошенные в цикле (NaN), не публикуются),
+        frame - одним кадром, both - обоими способами
+
+        Parameters:
+            timestamp (float): метка времени цикла
+            instruments (dict): значения каналов приборов
+            thermocouples (dict): значения термопар
+        """
+
+        if self.mode in ("topics", "both"):
+            for kind, values in (("instruments", instruments), ("thermocouples", thermocouples)):
+                for topic, value in values.items():
+                    if isinstance(value, float) and math.isnan(value): continue
+                    self.publish(value, f"{kind}/{topic}")
+            self.publish(timestamp, "timestamp")
+
+        if self.mode in ("frame", "both"):
+            self.publish_frame(timestamp, instruments, thermocouples)
+
+    @staticmethod
+    def __to_float(value) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float("nan")
+
+    def __enqueue(self, topic: str, payload: str | bytes, retain: bool = False) -> bool:
+        """
+        Поставить сообщение в очередь. Очередь разбирается сетевым потоком клиента (on_publish, on_connect);
+        вызывающий поток передаёт сообщения клиенту paho только если отправка простаивает
+        """
+
+        if not self.__isInited:
             return False
 
+        with self.__lock:
+            if len(self.__queue) == self.__queue.maxlen: self.dropped += 1
+            self.__queue.append((topic, payload, retain))
+            idle = self.__handed == 0
+        if idle: self.__flush()
+        return True
+
+    def __flush(self) -> None:
+        """
+        Передать сообщения из очереди клиенту paho, если соединение с брокером установлено:
+        клиенту передаётся не более max_inflight сообщений, следующие - по мере их отправки
+        """
+
+        with self.__lock:
+            while self.__queue and self.__handed < self.__window and self.isOnline:
+                topic, payload, retain = self.__queue[0]
+                self.__handed += 1
+                try:
+                    info = self.__client.publish(topic, payload, retain=retain)
+                except Exception as e:
+                    print(f"[!] Failed to publish the message with topic '{topic}': {e}")
+                    self.__handed -= 1
+                    self.__queue.popleft()
+                    continue
+                # Соединение потеряно или очередь клиента заполнена - сообщение останется в очереди
+                if info.rc in (mqtt_client.MQTT_ERR_NO_CONN, mqtt_client.MQTT_ERR_QUEUE_SIZE):
+                    self.__handed -= 1
+                    break
+                self.__queue.popleft()
+
+    ''' ---------------------------------------- @Callbacks ---------------------------------------- '''
+
+    def __on_connect(self, client, userdata, flags, reason_code, properties) -> None:
+        if reason_code == 0:
+            self.__schema = None  # Схема кадра будет повторно опубликована со следующим кадром
+            with self.__lock:
+                self.__handed = 0 # Сообщения, не отправленные до разрыва соединения, клиент paho не подтвердит
+            self.__flush()        # Отправляем сообщения, накопленные за время отсутствия соединения
+        else:
+            print(f"[!] MQTT Broker ({self.__broker}, {self.__port}) refused the connection: {reason_code}")
+
+    def __on_publish(self, client, userdata, mid, reason_code, properties) -> None:
+        with self.__lock:
+            self.__handed = max(self.__handed - 1, 0)
+        self.__flush()            # Передаём клиенту следующее сообщение из очереди
+
+    def __on_disconnect(self, client, userdata, flags, reason_code, properties) -> None:
+        if reason_code != 0:
+            print(f"[!] Lost connection to the MQTT Broker ({self.__broker}, {self.__port}): {reason_code}")
+
     ''' -------------------------------------- Dunder Methods -------------------------------------- '''
 
     def __del__(self) -> None:
@@ -0,0 +1,169 @@
+"""
+Перевод файлов измерений из прежней схемы (JSON строки в таблице instruments) в схему с типизированными
+измерениями (таблицы channels и samples, см. handlers/database_handler.py).
+
+Записи исходного файла читаются порциями по возрастанию id, поэтому объём используемой памяти
+не зависит от размера файла. Результат записывается в новый файл рядом с исходным (<имя>.v2.db),
+исходный файл не изменяется. После переноса строятся сводные таблицы rollups.
+Файлы с типизированными измерениями прежней версии схемы переводятся на текущую версию на месте:
+добавляются недостающие таблицы и строятся сводные таблицы.
+
+Использование:
+    python migrate_database.py [--chunk-size N] [--output-dir DIR] [файлы или каталоги ...]
+    python migrate_database.py --rebuild-rollups [файлы или каталоги ...]
+По умолчанию обрабатываются все файлы *.db в каталоге ./Data.
+С ключом --rebuild-rollups сводные таблицы файлов со сводными таблицами строятся заново по таблице samples
+(сводные таблицы файлов кадров ведёт FrameWriter при записи, такие файлы пропускаются)
+"""
+import argparse
+import os
+from glob import glob
+from sqlalchemy import create_engine, func, select
+from handlers.database_handler import (Info, Instruments, ChannelRegistry, FrameFiles, Samples, FRAMES_SCHEMA_VERSION,
+                                       ROLLUPS_SCHEMA_VERSION, SAMPLES_SCHEMA_VERSION, SCHEMA_VERSION, create_schema,
+                                       get_schema_version, parse_legacy_values, rebuild_rollups)
+from handlers.database_writer import enable_wal
+
+
+def migrate_database(source: str, target: str, chunk_size: int = 5000) -> int:
+    """
+    Переносит данные из файла прежней схемы в новый файл текущей схемы
+
+    Parameters:
+        source (str): исходный файл
+        target (str): создаваемый файл
+        chunk_size (int): количество записей, читаемых и записываемых за одну транзакцию
+
+    Returns:
+        int: количество перенесённых записей
+    """
+    source_engine = create_engine(f'sqlite:///{source}')
+    target_engine = create_engine(f'sqlite:///{target}')
+    enable_wal(target_engine)
+    create_schema(target_engine)
+    channels = ChannelRegistry()
+    migrated = 0
+
+    with source_engine.connect() as source_connection:
+        with target_engine.begin() as target_connection:
+            info = [dict(row._mapping) for row in source_connection.execute(select(Info.__table__))]
+            if info:
+                target_connection.execute(Info.__table__.insert(), info)
+
+        table = Instruments.__table__
+        last_id = 0
+        while True:
+            chunk = source_connection.execute(
+                select(table.c.id, table.c.timestamp_abs, table.c.instruments_values, table.c.thermocouples_values)
+                .where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+            ).all()
+            if not chunk:
+                break
+            with target_engine.begin() as target_connection:
+                samples = []
+                for row in chunk:
+                    try:
+                        timestamp = float(row.timestamp_abs)
+                    except (TypeError, ValueError):
+                        continue
+                    samples += channels.rows(target_connection, timestamp, {
+                        "instruments": parse_legacy_values(row.instruments_values),
+                        "thermocouples": parse_legacy_values(row.thermocouples_values)
+                    })
+                if samples:
+                    target_connection.execute(Samples.__table__.insert(), samples)
+            migrated += len(chunk)
+            last_id = chunk[-1].id
+
+    with target_engine.begin() as target_connection:
+        rebuild_rollups(target_connection)
+    source_engine.dispose()
+    target_engine.dispose()
+    return migrated
+
+
+def find_databases(paths: list[str]) -> list[str]:
+    files = []
+    for path in paths:
+        files += sorted(glob(os.path.join(path, '*.db'))) if os.path.isdir(path) else [path]
+    return files
+
+
+def upgrade_database(path: str) -> None:
+    """
+    Переводит файл с типизированными измерениями (версия схемы от SAMPLES_SCHEMA_VERSION) на текущую версию:
+    добавляет недостающие таблицы и, если их не было, строит сводные таблицы
+    """
+    engine = create_engine(f'sqlite:///{path}')
+    enable_wal(engine)
+    with engine.connect() as connection:
+        version = get_schema_version(connection)
+    create_schema(engine)
+    if version < ROLLUPS_SCHEMA_VERSION:
+        with engine.begin() as connection:
+            rebuild_rollups(connection)
+    engine.dispose()
+
+
+def rebuild_database_rollups(path: str) -> bool:
+    """
+    Заново строит сводные таблицы файла по таблице samples
+
+    Returns:
+        bool: False, если измерения файла записаны в файлы кадров и сводные таблицы не перестраивались
+    """
+    engine = create_engine(f'sqlite:///{path}')
+    enable_wal(engine)
+    try:
+        with engine.begin() as connection:
+            recorded_to_frames = (get_schema_version(connection) >= FRAMES_SCHEMA_VERSION and
+                                  connection.execute(select(func.count()).select_from(FrameFiles.__table__)).scalar())
+            if recorded_to_frames:
+                return False
+            rebuild_rollups(connection)
+        return True
+    finally:
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Перевод файлов измерений в типизированную схему")
+    parser.add_argument('paths', nargs='*', default=['./Data'], help="файлы *.db или каталоги с ними")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="количество записей в одной порции")
+    parser.add_argument('--output-dir', default=None, help="каталог для новых файлов (по умолчанию - рядом с исходными)")
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help="заново построить сводные таблицы файлов текущей схемы")
+    args = parser.parse_args()
+
+    for source in find_databases(args.paths):
+        engine = create_engine(f'sqlite:///{source}')
+        with engine.connect() as connection:
+            version = get_schema_version(connection)
+        engine.dispose()
+        if args.rebuild_rollups:
+            if version < ROLLUPS_SCHEMA_VERSION:
+                print(f"{source}: schema version {version}, migrate the file first")
+            elif rebuild_database_rollups(source):
+                print(f"{source}: rollups rebuilt")
+            else:
+                print(f"{source}: recorded to frame files, rollups are maintained by the recorder, skipped")
+            continue
+        if version >= SCHEMA_VERSION:
+            print(f"{source}: already in schema version {version}, skipped")
+            continue
+        if version >= SAMPLES_SCHEMA_VERSION:
+            upgrade_database(source)
+            print(f"{source}: upgraded from schema version {version} to {SCHEMA_VERSION}")
+            continue
+        target = os.path.splitext(source)[0] + '.v2.db'
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            target = os.path.join(args.output_dir, os.path.basename(target))
+        if os.path.exists(target):
+            print(f"{source}: {target} already exists, skipped")
+            continue
+        print(f"{source} -> {target}: {migrate_database(source, target, args.chunk_size)} records migrated")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@ import pyqtgraph
 import test_ui
 import start_experiment_dialog
 from PyQt5 import QtWidgets, QtCore, QtGui
-from handlers.database_handler import Info, Instruments, Base
+from handlers.database_handler import Info, create_schema
 from handlers.instruments_handler import *
 import os
 from sqlalchemy.orm import sessionmaker
@@ -12,7 +12,15 @@ import pyvisa
 from datetime import datetime, timedelta
 import numpy as np
 from handlers.mqtt_client import MQTTProducer
+from handlers.database_writer import FrameWriter, SampleWriter, enable_wal
+from handlers.acquisition import (CircuitBreaker, CycleScheduler, PollGroup, DERIVED_INPUTS, base_period,
+                                  derived_channel, compute_derived)
+import math
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable
 
 
 class Plot:
@@ -76,8 +84,21 @@ def calc_cathode_temp(voltage, current, k):
         return T_K
 
 
+def is_nan(value) -> bool:
+    # NaN в записи такта обозначает канал, не опрошенный в этом такте
+    return isinstance(value, float) and math.isnan(value)
+
+
+@derived_channel("T_cathode", inputs=("cathode_voltage", "cathode_current"))
+def cathode_temp_channel(snapshot: dict, params: dict) -> float:
+    # Температура катода по напряжению и току, измеренным одним запросом в одном цикле
+    return calc_cathode_temp(voltage=snapshot["cathode_voltage"], current=snapshot["cathode_current"], k=params["k"])
+
+
 class Reader(QtCore.QObject):
-    reader_result = QtCore.pyqtSignal(dict, dict, float)
+    # все каналы (для отображения), время такта и запись такта (для хранения и публикации)
+    reader_result = QtCore.pyqtSignal(dict, dict, float, dict)
+    command_result = QtCore.pyqtSignal(str, str, object, bool)  # прибор, параметр, значение, успешность
 
     def __init__(
         self,
@@ -93,13 +114,18 @@ class Reader(QtCore.QObject):
         pressure_3    : VacuumeterERSTEVAK,
         thermocouple  : NIDAQInstrument,
         k_value       : float,
-        mqtt_configs  : dict
+        mqtt_configs  : dict,
+        concurrent    : bool = True,
+        poll_periods  : dict[str, float] | None = None
     ) -> None:
 
         QtCore.QObject.__init__(self)
 
         self.read_interval = read_interval
         self.k             = k_value
+        self.derived_params = {"k": k_value}  # параметры расчёта производных каналов
+        self.concurrent    = concurrent  # параллельный опрос независимых приборов
+        self.poll_periods  = poll_periods if isinstance(poll_periods, dict) else {}  # периоды опроса групп, мс
 
         self.client       = MQTTProducer(mqtt_configs)
 
@@ -114,59 +140,263 @@ class Reader(QtCore.QObject):
         self.pressure_3   = pressure_3
         self.thermocouple = thermocouple
 
-    def run(self) -> None:
-        while True:
-            start = time.perf_counter()
-            delay = timedelta(milliseconds=self.read_interval)
-            deadline = datetime.now() + delay 
-            instrument_data   = {}
-            thermocouple_data = {}
-            
-            # ----------------------- Publish the data --------------------------------
-            start_sample = time.perf_counter()
-            instrument_data.update({"sample_current": self.sample.get_current()})
-            instrument_data.update({"sample_voltage": self.sample.get_voltage()})
-            instrument_data.update({"discharge_current": self.discharge.get_current()})
-            instrument_data.update({"discharge_voltage": self.discharge.get_voltage()})
-            instrument_data.update({"discharge_power": self.discharge.get_power()})
-            instrument_data.update({"solenoid_current_1": self.solenoid_1.get_current()})
-            instrument_data.update({"solenoid_voltage_1": self.solenoid_1.get_voltage()})
-            instrument_data.update({"solenoid_current_2": self.solenoid_2.get_current()})
-            instrument_data.update({"solenoid_voltage_2": self.solenoid_2.get_voltage()})
-            instrument_data.update({"solenoid_power_2": self.solenoid_2.get_power()})
-            instrument_data.update({"cathode_current": self.cathode.get_current()})
-            instrument_data.update({"cathode_voltage": self.cathode.get_voltage()})
-            instrument_data.update({"cathode_power": self.cathode.get_power()})
-            instrument_data.update({"T_cathode"          : calc_cathode_temp(
-                                                                    voltage = self.cathode.get_voltage(), 
-                                                                    current = self.cathode.get_current(), 
-                                                                    k       = self.k)})
-            instrument_data.update({"rrg_value": self.rrg.get_flow_inlet()})
-            instrument_data.update({"pressure_1": self.pressure_1.return_value()})
-            instrument_data.update({"pressure_2": self.pressure_2.return_value()})
-            instrument_data.update({"pressure_3": self.pressure_3.return_value()})
-            thermocouple_data_raw = self.thermocouple.read_thermocouple()
-            for i in range(len(thermocouple_data_raw)):
-                thermocouple_data.update({f"CH{i}": thermocouple_data_raw[i]})
-        
-            timestamp = datetime.now().timestamp()
-            self.reader_result.emit(instrument_data, thermocouple_data, timestamp)
+        self.gauge_health: dict[str, CircuitBreaker] = {}  # состояние вакуумметров на общих шлюзах
+        readers = self._create_readers()
+        periods = {name: self._get_poll_period(channels) for name, (_, channels) in readers.items()}
+        self.tick_interval = base_period(list(periods.values()))  # период базовой сетки, мс
+        for name, period in periods.items():
+            rounded = max(round(period / self.tick_interval), 1) * self.tick_interval
+            if rounded != period:
+                print(f"(!) Reader: poll period of {name} ({period} ms) is rounded to {rounded} ms")
+
+        self.scheduler = CycleScheduler(period=self.tick_interval * 1e-3)
+
+        self.poll_groups = {name: PollGroup(name, read, round(periods[name] / self.tick_interval),
+                                            check=partial(self._is_read_ok, instruments))
+                            for name, (read, instruments) in readers.items()}
+        # прибор -> группа опроса, в очередь которой ставятся его команды
+        self.instrument_groups = {instrument: name for name, (_, instruments) in readers.items() for instrument in instruments}
+        self.executor = ThreadPoolExecutor(max_workers=len(self.poll_groups), thread_name_prefix="reader")
+
+    def _create_readers(self) -> dict[str, tuple[Callable[[], dict], list[str]]]:
+        """
+        Формирует группы опроса: каждая группа соответствует независимому каналу связи
+        и опрашивается последовательно, а сами группы могут опрашиваться параллельно.
+        Вакуумметры, подключенные к одному шлюзу, объединяются в одну группу,
+        чтобы не открывать несколько соединений к нему одновременно; работоспособность каждого
+        вакуумметра группы отслеживается отдельно.
+        Для каждой группы возвращается функция опроса и список приборов, задающих её период
+        """
+        readers = {
+            "sample": (self._read_sample, ["sample"]),
+            "discharge": (self._read_discharge, ["discharge"]),
+            "solenoid_1": (self._read_solenoid_1, ["solenoid_1"]),
+            "solenoid_2": (self._read_solenoid_2, ["solenoid_2"]),
+            "cathode": (self._read_cathode, ["cathode"]),
+            "rrg": (self._read_rrg, ["rrg"]),
+            "thermocouple": (self._read_thermocouple, ["thermocouple"])
+        }
+        gauges = {}
+        for name, gauge in (("pressure_1", self.pressure_1), ("pressure_2", self.pressure_2), ("pressure_3", self.pressure_3)):
+            gauges.setdefault(gauge.endpoint, []).append((name, gauge))
+        for i, members in enumerate(gauges.values()):
+            readers[f"pressure_gateway_{i}"] = (partial(self._read_pressures, members), [name for name, _ in members])
+            for name, _ in members:
+                self.gauge_health[name] = CircuitBreaker(name)
+        return readers
+
+    def _get_poll_period(self, instruments: list[str]) -> float:
+        """
+        Период опроса группы: наименьший из периодов входящих в неё приборов, по умолчанию Read_interval, мс
+        """
+        return min(float(self.poll_periods.get(name, self.read_interval)) for name in instruments)
+
+    def _is_read_ok(self, instruments: list[str]) -> bool:
+        """
+        Группа считается отвечающей, если последний опрос успешен хотя бы для одного её прибора.
+        Группа вакуумметров на общем шлюзе из опроса не исключается: неотвечающие вакуумметры
+        исключаются по отдельности (см. _read_pressures)
+        """
+        if all(name in self.gauge_health for name in instruments):
+            return True
+        return any(getattr(self, name).last_read_ok for name in instruments)
+
+    def _read_sample(self) -> dict:
+        values = self.sample.measure_all(("current", "voltage"))
+        return {
+            "sample_current": values["current"],
+            "sample_voltage": values["voltage"]
+        }
 
-            self.client.connect()
+    def _read_discharge(self) -> dict:
+        values = self.discharge.measure_all(("current", "voltage", "power"))
+        return {
+            "discharge_current": values["current"],
+            "discharge_voltage": values["voltage"],
+            "discharge_power": values["power"]
+        }
+
+    def _read_solenoid_1(self) -> dict:
+        values = self.solenoid_1.measure_all(("current", "voltage"))
+        return {
+            "solenoid_current_1": values["current"],
+            "solenoid_voltage_1": values["voltage"]
+        }
 
-            for topic, value in instrument_data.items():
-                self.client.publish(value, f"instruments/{topic}")
+    def _read_solenoid_2(self) -> dict:
+        values = self.solenoid_2.measure_all(("current", "voltage", "power"))
+        return {
+            "solenoid_current_2": values["current"],
+            "solenoid_voltage_2": values["voltage"],
+            "solenoid_power_2": values["power"]
+        }
 
-            for topic, value in thermocouple_data.items():
-                self.client.publish(value, f"thermocouples/{topic}")
-            
-            self.client.publish(timestamp, "timestamp")
+    def _read_cathode(self) -> dict:
+        values = self.cathode.measure_all(("current", "voltage", "power"))
+        return {
+            "cathode_current": values["current"],
+            "cathode_voltage": values["voltage"],
+            "cathode_power": values["power"]
+        }
+
+    def _read_rrg(self) -> dict:
+        self.rrg.refresh()  # один запрос регистров за цикл, значения берутся из снимка
+        return {"rrg_value": self.rrg.get_flow_inlet()}
+
+    def _read_pressures(self, gauges: list) -> dict:
+        """
+        Опрашивает вакуумметры шлюза одним обменом. Вакуумметры, переставшие отвечать, исключаются
+        из запроса и проверяются пробным опросом по расписанию своего CircuitBreaker,
+        поэтому не задерживают опрос остальных на время таймаута; их значение - NaN (в хранилище не записывается)
+        """
+        values = dict.fromkeys([name for name, _ in gauges], math.nan)
+        active = []
+        for name, gauge in gauges:
+            if self.gauge_health[name].allow():
+                active.append((name, gauge))
+            else:
+                gauge.last_read_ok = False
+        values.update(zip([name for name, _ in active], VacuumeterERSTEVAK.read_many([gauge for _, gauge in active])))
+        for name, gauge in active:
+            self.gauge_health[name].record(gauge.last_read_ok)
+        return values
+
+    def _read_thermocouple(self) -> dict:
+        thermocouple_data_raw = self.thermocouple.read_thermocouple()
+        return {f"CH{i}": thermocouple_data_raw[i] for i in range(len(thermocouple_data_raw))}
+
+    def send_command(self, instrument: str, parameter: str, func: Callable, *args) -> None:
+        """
+        Ставит команду управления прибором в очередь его группы опроса (может вызываться из потока GUI).
+        Команда выполняется в ближайшем такте потоком опроса; если до этого для того же параметра
+        поступит новая команда, будет отправлено только последнее значение.
+        Результат выполнения передаётся сигналом command_result
+
+        Parameters:
+            instrument (str): название прибора (sample, discharge, rrg, ...)
+            parameter (str): название параметра (voltage, current, output, ...)
+            func (Callable): метод прибора, выполняющий команду
+            args: аргументы метода
+        """
+        self.poll_groups[self.instrument_groups[instrument]].commands.put(parameter, func, *args)
+
+    def _serve(self, group: PollGroup, poll: bool) -> dict:
+        # в сигнале command_result передаётся название группы (для приборов с отдельным каналом связи совпадает с названием прибора)
+        return group.serve(poll, partial(self.command_result.emit, group.name))
+
+    def _snapshot(self) -> dict:
+        """
+        Снимок измерений цикла: последние значения всех групп приборов, каждая величина считана один раз
+        """
+        snapshot = {}
+        for name, group in self.poll_groups.items():
+            if name != "thermocouple":
+                snapshot.update(group.values)
+        return snapshot
+
+    def _record(self, derived: dict) -> dict:
+        """
+        Запись такта для хранения и публикации: все каналы в постоянном порядке, поэтому состав кадра не меняется.
+        Каналы групп, не опрошенных после предыдущего такта, и производные каналы, ни один из входных каналов
+        которых не опрошен, записываются как NaN, чтобы значения медленных групп не повторялись каждый такт
+
+        Returns:
+            dict: {"instruments": {...}, "thermocouples": {...}}
+        """
+        record = {"instruments": {}, "thermocouples": {}}
+        for name, group in self.poll_groups.items():
+            values = group.take_fresh()
+            if values is None:
+                values = dict.fromkeys(group.values, math.nan)
+            record["thermocouples" if name == "thermocouple" else "instruments"].update(values)
+        for name, value in derived.items():
+            inputs = DERIVED_INPUTS.get(name)
+            if inputs is None or any(not is_nan(record["instruments"].get(channel, math.nan)) for channel in inputs):
+                record["instruments"][name] = value
+            else:
+                record["instruments"][name] = math.nan
+        return record
+
+    def _acquire(self, tick: int) -> bool:
+        """
+        Опрашивает группы приборов, для которых наступил такт опроса.
+        В параллельном режиме длительность такта определяется самым медленным прибором, но не превышает
+        период сетки: не успевшие ответить группы дочитываются в фоне, а их значения попадают в следующие такты.
+        Пробные опросы неотвечающих приборов в обоих режимах выполняются в фоне и не задерживают такт
+
+        Returns:
+            bool: True, если в этом такте была опрошена хотя бы одна группа
+        """
+        due = [group for group in self.poll_groups.values() if group.is_due(tick) and not group.isBusy]
+        for group in due:
+            group.schedule(tick)
+        # группы, которым нужно только выполнить команды управления
+        commanded = [group for group in self.poll_groups.values()
+                     if group not in due and not group.isBusy and len(group.commands)]
+        probing = [group for group in due if self._is_probing(group)]
+        if self.concurrent:
+            for group in due + commanded:
+                group.future = self.executor.submit(self._serve, group, group in due)
+            wait([group.future for group in due + commanded if group not in probing], timeout=self.scheduler.period)
+        else:
+            for group in due + commanded:
+                if group in probing:
+                    group.future = self.executor.submit(self._serve, group, True)
+                else:
+                    self._serve(group, group in due)
+        return bool(due)
+
+    def _is_probing(self, group: PollGroup) -> bool:
+        """
+        Проверяет, будет ли опрос группы пробным опросом неотвечающего прибора (всей группы или вакуумметра
+        на общем шлюзе): такой опрос может длиться до таймаута обмена
+        """
+        if group.health.isOpen:
+            return True
+        return any(health.isOpen and health.allow() for name, health in self.gauge_health.items()
+                   if self.instrument_groups[name] == group.name)
 
+    def run(self) -> None:
+        self.client.connect()  # соединение с брокером поддерживается на всё время работы
+        self.scheduler.reset()
+        try:
+            while self.scheduler.wait_next():
+                start = time.perf_counter()
+
+                # ----------------------- Publish the data --------------------------------
+                if not self._acquire(self.scheduler.tick):
+                    continue
+                if not all(group.values for group in self.poll_groups.values()):
+                    continue  # первый опрос ещё не завершён для всех групп
+                thermocouple_data = dict(self.poll_groups["thermocouple"].values)
+                instrument_data   = self._snapshot()
+                derived = compute_derived(instrument_data, self.derived_params)
+                instrument_data.update(derived)
+                record = self._record(derived)
+
+                timestamp = self.scheduler.tick_timestamp
+                self.reader_result.emit(instrument_data, thermocouple_data, timestamp, record)
+
+                self.client.publish_cycle(timestamp, record["instruments"], record["thermocouples"])
+
+                end = time.perf_counter()
+                stats = self.scheduler.stats
+                suspended = ([name for name, group in self.poll_groups.items() if group.health.isOpen]
+                             + [name for name, health in self.gauge_health.items() if health.isOpen])
+                print(f"Target reader cycle: {round(float(self.tick_interval*1e-3), 2)}, got {round(end - start, 3)}, "
+                      f"lateness {round(stats['lateness'], 4)}, jitter {round(stats['jitter'], 4)}, missed {stats['missed']}"
+                      + (f", suspended {suspended}" if suspended else ""))
+        finally:
+            # дожидаемся опросов, выполняемых в фоне, чтобы не прерывать обмен с приборами
+            self.executor.shutdown(wait=True, cancel_futures=True)
             self.client.disconnect()
-            # if datetime.now() < deadline:
-            #     pass
-            end = time.perf_counter()
-            print(f"Target reader cycle: {round(float(self.read_interval*1e-3), 2)}, got {end - start}")
+
+    def stop(self) -> None:
+        """
+        Останавливает цикл опроса после завершения текущего такта.
+        Пул потоков опроса и соединение с брокером закрываются в run() после выхода из цикла
+        """
+        self.scheduler.stop()
 
 class PLMControl(QtWidgets.QMainWindow):
 
@@ -174,6 +404,7 @@ class PLMControl(QtWidgets.QMainWindow):
         QtWidgets.QMainWindow.__init__(self)
 
         self.start_db_writing = False
+        self.db_writer = None
         
         self.power_devices_state = {}
         self.is_state_restored = False
@@ -273,7 +504,11 @@ class PLMControl(QtWidgets.QMainWindow):
         self.ui_main.set_gas.currentTextChanged.connect(self.set_gas)
 
     def __del__(self):
-        self.reading_thread.terminate()
+        self.reading_worker.stop()
+        self.reading_thread.quit()
+        if not self.reading_thread.wait(int(self.read_interval) * 2):
+            self.reading_thread.terminate()
+        self.stop_database_writer()
 
     def _restore_state(self):
         with open('state.json', 'r') as file:
@@ -385,12 +620,15 @@ class PLMControl(QtWidgets.QMainWindow):
                                            rrg=self.rrg, pressure_1=self.pressure_1,
                                            pressure_2=self.pressure_2, pressure_3=self.pressure_3, 
                                            thermocouple=self.thermocouple, k_value=self.k,
-                                           mqtt_configs=self.mqtt_configs)
+                                           mqtt_configs=self.mqtt_configs,
+                                           concurrent=self.concurrent_read,
+                                           poll_periods=self.poll_periods)
         
         self.reading_thread = QtCore.QThread()
         self.reading_worker.moveToThread(self.reading_thread)
         self.reading_thread.started.connect(self.reading_worker.run)
         self.reading_worker.reader_result.connect(self.get_values)
+        self.reading_worker.command_result.connect(self.command_finished)
         self.reading_thread.start()
 
         self.init_graphs()
@@ -404,10 +642,13 @@ class PLMControl(QtWidgets.QMainWindow):
         self.ui_start = start_experiment_dialog.Ui_Dialog()
         self.ui_start_dialog = QtWidgets.QDialog()
         self.ui_start.setupUi(self.ui_start_dialog)
+        self.ui_start.init_progress.setVisible(False)
+        self.ui_start.init_status.setVisible(False)
 
     def start_main_window(self):
-        self.ui_start_dialog.close()
+        self.ui_start.OK_button.setDisabled(True)
         self._init_main()
+        self.ui_start_dialog.close()
 
         path = self.config['Path_to_write']
         try:
@@ -436,9 +677,31 @@ class PLMControl(QtWidgets.QMainWindow):
 
     def create_database(self, name, path):
         engine = create_engine(f'sqlite:///{path}/{name}.db')
-        Base.metadata.create_all(engine)
+        enable_wal(engine)
+        create_schema(engine)
         Session = sessionmaker(bind=engine)
         self.session = Session()
+        # измерения записываются фоновым потоком пакетами, не задерживая поток интерфейса
+        writer_options = {
+            "batch_size": int(self.config.get('Db_batch_size', '100')),
+            "flush_interval": float(self.config.get('Db_flush_interval', '1.0'))
+        }
+        if self.config.get('Recorder', 'sqlite') == 'frames':
+            # двоичные файлы кадров рядом с файлом измерений, в базе - описание эксперимента и список файлов
+            self.db_writer = FrameWriter(engine, path, name,
+                                         dtype=self.config.get('Recorder_dtype', 'float32'),
+                                         chunk_frames=int(self.config.get('Recorder_chunk_frames', '100000')),
+                                         **writer_options)
+        else:
+            self.db_writer = SampleWriter(engine, **writer_options)
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.stop_database_writer)
+
+    def stop_database_writer(self):
+        """
+        Дописывает накопленные измерения и останавливает поток записи (время ожидания ограничено)
+        """
+        if self.db_writer is not None and self.db_writer.isRunning:
+            self.db_writer.stop(timeout=float(self.config.get('Db_stop_timeout', '5.0')))
 
     def start_experiment(self):
         self.experiment_timer.start(1000)
@@ -488,6 +751,7 @@ class PLMControl(QtWidgets.QMainWindow):
             choosen_facility = self.ui_start.facility.currentText()
             path = config_paths[choosen_facility]
             print(f"Configuration for the '{choosen_facility}' facility")
+            self.config_path = path
             return json.load(open(path))
         except Exception as error:
             print(f"[!] Failed to choose the configuration file: {error}")
@@ -500,6 +764,8 @@ class PLMControl(QtWidgets.QMainWindow):
         self.k = float(self.config['k_value'])
         self.graph_size = int(self.config['Graph_size'])
         self.mqtt_configs = self.config["mqtt"] if "mqtt" in self.config else {}
+        self.concurrent_read = bool(int(self.config.get('Concurrent_read', '1')))
+        self.init_timeout = float(self.config.get('Init_timeout', '15'))  # общее время подключения приборов, с
 
         self.sample_ip = self.config['sample_properties'][0]['IP']
         self.sample_connect = self.config['sample_properties'][0]['connection_type']
@@ -516,6 +782,30 @@ class PLMControl(QtWidgets.QMainWindow):
         self.cathode_ip = self.config['cathode_properties'][0]['IP']
         self.cathode_connect = self.config['cathode_properties'][0]['connection_type']
 
+        # Результаты калибровки задержек запросов хранятся рядом с файлом конфигурации
+        query_delay_file = self.config.get('Query_delay_file')
+        if query_delay_file:
+            query_delay_file = os.path.join(os.path.dirname(os.path.abspath(self.config_path)), query_delay_file)
+
+        # Дополнительные параметры драйверов источников питания
+        self.scpi_options = {
+            name: {
+                "driver": properties.get('driver', 'visa'),
+                "lock_mode": properties.get('lock_mode', 'query'),
+                "timeout": float(properties.get('timeout', 1.0)),
+                "query_delay": properties.get('query_delay', SCPIInstrument.DEFAULT_QUERY_DELAY),
+                "query_delay_file": query_delay_file,
+                "verify_setpoints": bool(int(properties.get('verify_setpoints', 0)))
+            }
+            for name, properties in (
+                ("sample", self.config['sample_properties'][0]),
+                ("discharge", self.config['discharge_properties'][0]),
+                ("solenoid_1", self.config['solenoid_properties'][0]),
+                ("solenoid_2", self.config['solenoid_properties'][1]),
+                ("cathode", self.config['cathode_properties'][0])
+            )
+        }
+
         self.thermocouple_path = self.config['Thermocouple'][0]['Path']
         self.thermocouple_array_size = int(self.config['Thermocouple'][0]['Array_size'])
         self.thermocouple_channel_start = int(self.config['Thermocouple'][0]['Channel_start'])
@@ -527,6 +817,21 @@ class PLMControl(QtWidgets.QMainWindow):
         self.pressure_2_config = self.config['Pressure2'][0]
         self.pressure_3_config = self.config['Pressure3'][0]
 
+        # Собственные периоды опроса приборов (мс), по умолчанию используется Read_interval
+        poll_configs = {
+            "sample": self.config['sample_properties'][0],
+            "discharge": self.config['discharge_properties'][0],
+            "solenoid_1": self.config['solenoid_properties'][0],
+            "solenoid_2": self.config['solenoid_properties'][1],
+            "cathode": self.config['cathode_properties'][0],
+            "rrg": self.rrg_config,
+            "thermocouple": self.config['Thermocouple'][0],
+            "pressure_1": self.pressure_1_config,
+            "pressure_2": self.pressure_2_config,
+            "pressure_3": self.pressure_3_config
+        }
+        self.poll_periods = {name: float(config.get('Poll_period', self.read_interval)) for name, config in poll_configs.items()}
+
         self.ui_main.set_u_sample.setMinimum(-int(self.config['sample_properties'][0]['Voltage_limit']))
         self.ui_main.set_u_sample.setMaximum(int(self.config['sample_properties'][0]['Voltage_limit']))
         self.ui_main.set_u_sample_slider.setMinimum(-float(self.config['sample_properties'][0]['Voltage_limit']))
@@ -585,64 +890,131 @@ class PLMControl(QtWidgets.QMainWindow):
     def _init_instruments(self):
         print("Establishing connection with sensors...")
         self.rm = pyvisa.ResourceManager()
-        self.sample = SCPIInstrument(self.rm, self.sample_connect, self.sample_ip, 5025, name='Sample')
-        if self.is_state_restored:
-            self.sample.state = self.power_devices_state[self.sample.name]
-        else:
-            self.power_devices_state.update({self.sample.name: self.sample.state})
-        if not self.sample.isInitialized:
-            self.ui_main.check_remote_sample.setDisabled(True)
-
-        self.discharge = SCPIInstrument(self.rm, self.discharge_connect, self.discharge_ip, 0, name='Discharge')
-        if self.is_state_restored:
-            self.discharge.state = self.power_devices_state[self.discharge.name]
-        else:
-            self.power_devices_state.update({self.discharge.name: self.discharge.state})
-        if not self.discharge.isInitialized:
-            self.ui_main.check_remote_discharge.setDisabled(True)
-
-        self.solenoid_1 = SCPIInstrument(self.rm, self.solenoid_connect, self.solenoid_ip, 5025, name='Solenoid')
-        if self.is_state_restored:
-            self.solenoid_1.state = self.power_devices_state[self.solenoid_1.name]
-        else:
-            self.power_devices_state.update({self.solenoid_1.name: self.solenoid_1.state})
-        if not self.solenoid_1.isInitialized:
-            self.ui_main.check_remote_solenoid_1.setDisabled(True)
-
-        self.solenoid_2 = SCPIInstrument(self.rm, self.solenoid_connect_2, self.solenoid_ip_2, 0, name='Solenoid 2')
-        if self.is_state_restored:
-            self.solenoid_2.state = self.power_devices_state[self.solenoid_2.name]
-        else:
-            self.power_devices_state.update({self.solenoid_2.name: self.solenoid_2.state})
-        if not self.solenoid_2.isInitialized:
-            self.ui_main.check_remote_solenoid_2.setDisabled(True)
-
-        self.cathode = SCPIInstrument(self.rm, self.cathode_connect, self.cathode_ip, 0, name='Cathode')
-        if self.is_state_restored:
-            self.cathode.state = self.power_devices_state[self.cathode.name]
-        else:
-            self.power_devices_state.update({self.cathode.name: self.cathode.state})
-        if not self.cathode.isInitialized:
-            self.ui_main.check_remote_cathode.setDisabled(True)
+        for name, instrument in self._connect_instruments(self._instrument_factories()).items():
+            setattr(self, name, instrument)
+
+        for name, check_remote in (("sample", self.ui_main.check_remote_sample),
+                                   ("discharge", self.ui_main.check_remote_discharge),
+                                   ("solenoid_1", self.ui_main.check_remote_solenoid_1),
+                                   ("solenoid_2", self.ui_main.check_remote_solenoid_2),
+                                   ("cathode", self.ui_main.check_remote_cathode)):
+            instrument = getattr(self, name)
+            if self.is_state_restored:
+                instrument.state = self.power_devices_state[instrument.name]
+            else:
+                self.power_devices_state.update({instrument.name: instrument.state})
+            if not instrument.isInitialized:
+                check_remote.setDisabled(True)
 
-        self.rrg = RRGInstrument(self.rrg_config)
         if not self.rrg.isInitialized:
             self.ui_main.set_rrg_state.setDisabled(True)
         else:
-            self.rrg.set_flow(0)
+            # Поток опроса ещё не создан: клапан закрывается напрямую, без очереди команд,
+            # а переключатель устанавливается без вызова set_rrg_state
+            self.ui_main.set_rrg_state.blockSignals(True)
             self.ui_main.set_rrg_state.setCurrentIndex(1) # closed
+            self.ui_main.set_rrg_state.blockSignals(False)
+            self.rrg.set_state(1)
+            self.ui_main.set_rrg.setDisabled(True)
+            self.ui_main.set_rrg_slider.setDisabled(True)
 
-        self.thermocouple = NIDAQInstrument(self.thermocouple_path, 'thermocouples', self.thermocouple_channel_start,
-                                            self.thermocouple_channel_stop)
-        self.thermocouple.create_multiple_thermocouples()
         for i in range(self.thermocouple_channel_stop - self.thermocouple_channel_start + 1):
             self.ui_main.thermocoples_table.insertRow(i)
 
-        self.pressure_1 = VacuumeterERSTEVAK(self.pressure_1_config)
-        self.pressure_2 = VacuumeterERSTEVAK(self.pressure_2_config)
-        self.pressure_3 = VacuumeterERSTEVAK(self.pressure_3_config)
-
-    def get_values(self, instruments: dict[str, float], thermocouples: dict[str, float], timestamp: float):
+    def _instrument_factories(self) -> dict[str, tuple[Callable, Callable]]:
+        """
+        Функции подключения приборов: название атрибута -> (подключение, создание неподключенного прибора).
+        Неподключенный прибор создаётся без обмена данными и используется, если прибор не ответил
+        до истечения общего времени запуска
+        """
+        scpi = {
+            "sample": (self.sample_connect, self.sample_ip, 5025, 'Sample'),
+            "discharge": (self.discharge_connect, self.discharge_ip, 0, 'Discharge'),
+            "solenoid_1": (self.solenoid_connect, self.solenoid_ip, 5025, 'Solenoid'),
+            "solenoid_2": (self.solenoid_connect_2, self.solenoid_ip_2, 0, 'Solenoid 2'),
+            "cathode": (self.cathode_connect, self.cathode_ip, 0, 'Cathode')
+        }
+        factories = {
+            name: (partial(create_scpi_instrument, self.rm, connection_type, ip, port, name=label, **self.scpi_options[name]),
+                   partial(SCPIInstrument.offline, label))
+            for name, (connection_type, ip, port, label) in scpi.items()
+        }
+        factories["rrg"] = (self._connect_rrg, partial(RRGInstrument.offline, self.rrg_config))
+        factories["thermocouple"] = (self._connect_thermocouple,
+                                     partial(NIDAQInstrument.offline, self.thermocouple_path, 'thermocouples',
+                                             self.thermocouple_channel_start, self.thermocouple_channel_stop))
+        for name, config in (("pressure_1", self.pressure_1_config), ("pressure_2", self.pressure_2_config),
+                             ("pressure_3", self.pressure_3_config)):
+            factories[name] = (partial(VacuumeterERSTEVAK, config), partial(VacuumeterERSTEVAK.offline, config))
+        return factories
+
+    def _connect_rrg(self) -> RRGInstrument:
+        rrg = create_rrg_instrument(self.rrg_config)
+        if rrg.isInitialized:
+            rrg.set_flow(0)
+        return rrg
+
+    def _connect_thermocouple(self) -> NIDAQInstrument:
+        thermocouple = NIDAQInstrument(self.thermocouple_path, 'thermocouples', self.thermocouple_channel_start,
+                                       self.thermocouple_channel_stop)
+        thermocouple.create_multiple_thermocouples()
+        return thermocouple
+
+    def _connect_instruments(self, factories: dict[str, tuple[Callable, Callable]]) -> dict:
+        """
+        Подключает приборы параллельно, показывая ход подключения в стартовом окне.
+        Время запуска ограничено Init_timeout: приборы, не ответившие за это время, заменяются неподключенными,
+        поэтому время запуска определяется самым медленным прибором, а не суммой таймаутов всех приборов.
+        Подключение выполняется в фоновых (daemon) потоках: зависшее подключение не задерживает завершение программы
+        """
+        futures = {self._start_connect(name, factory): name for name, (factory, _) in factories.items()}
+        deadline = time.monotonic() + self.init_timeout
+        self.ui_start.init_progress.setMaximum(len(futures))
+        self.ui_start.init_progress.setVisible(True)
+        self.ui_start.init_status.setVisible(True)
+
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _, pending = wait(pending, timeout=min(remaining, 0.05))
+            self.ui_start.init_progress.setValue(len(futures) - len(pending))
+            self.ui_start.init_status.setText('Подключение: ' + ', '.join(sorted(futures[future] for future in pending)))
+            QtWidgets.QApplication.processEvents()
+
+        instruments = {}
+        for future, name in futures.items():
+            offline = factories[name][1]
+            if future.done() and future.exception() is None:
+                instruments[name] = future.result()
+            else:
+                reason = future.exception() if future.done() else f'no response in {self.init_timeout} s'
+                print(f'(!) {name} failed to connect ({reason}), continuing without it')
+                instruments[name] = offline()
+        self.ui_start.init_status.setText('Подключение завершено')
+        return instruments
+
+    @staticmethod
+    def _start_connect(name: str, factory: Callable) -> Future:
+        """
+        Запускает подключение прибора в фоновом потоке и возвращает Future с подключенным прибором
+        """
+        future = Future()
+
+        def connect():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(factory())
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=connect, name=f"init-{name}", daemon=True).start()
+        return future
+
+    def get_values(self, instruments: dict[str, float], thermocouples: dict[str, float], timestamp: float,
+                   record: dict[str, dict]):
         sample_voltage = instruments['sample_voltage']
         sample_current = instruments['sample_current']
         discharge_voltage = instruments['discharge_voltage']
@@ -691,17 +1063,19 @@ class PLMControl(QtWidgets.QMainWindow):
         self.thermocouple_plots.update(timestamp, [value for _, value in thermocouples.items()])
 
         if self.start_db_writing:
-            commit = Instruments(
-                # TODO: remove unnecessary fields in database schema
-                time=None,
-                time_experiment=None,
-                timestamp_abs=str(timestamp),
-                timestamp_experimental=None,
-                instruments_values=json.dumps(instruments),
-                thermocouples_values=json.dumps(thermocouples)
-            )
-            self.session.add(commit)
-            self.session.commit()
+            # каналы, не опрошенные в этом такте (NaN), в таблицу samples не записываются
+            self.db_writer.put((timestamp, record))
+
+    def _send_command(self, instrument: str, parameter: str, func, *args):
+        """
+        Передаёт команду управления прибором в поток опроса, не блокируя интерфейс на время обмена с прибором
+        """
+        self.reading_worker.send_command(instrument, parameter, func, *args)
+
+    def command_finished(self, instrument: str, parameter: str, value, ok: bool):
+        if not ok:
+            print(f'(!) {instrument}: command {parameter} {"" if value is None else value} has failed')
+            self.ui_mainwindow.statusBar().showMessage(f'{instrument}: не удалось выполнить команду {parameter}', 5000)
 
     def sample_local(self):
         if self.ui_main.check_local_sample.isChecked():
@@ -737,17 +1111,17 @@ class PLMControl(QtWidgets.QMainWindow):
         if self.ui_main.sample_start.isChecked():
             self.ui_main.sample_stop.setChecked(False)
             self.ui_main.sample_start.setDisabled(True)
-            self.sample.set_output_on()
+            self._send_command("sample", "output", self.sample.set_output_on)
 
     def sample_remote_stop(self):
         if self.ui_main.sample_stop.isChecked():
             self.ui_main.sample_start.setChecked(False)
             self.ui_main.sample_start.setDisabled(False)
-            self.sample.set_output_off()
+            self._send_command("sample", "output", self.sample.set_output_off)
 
     def discharge_local(self):
         if self.ui_main.check_local_discharge.isChecked():
-            self.discharge.set_mode_local()
+            self._send_command("discharge", "mode", self.discharge.set_mode_local)
             print('DISCHARGE: SYSTEM:LOCAL')
             self.ui_main.check_remote_discharge.setDisabled(False)
             self.ui_main.check_remote_discharge.setChecked(False)
@@ -763,7 +1137,7 @@ class PLMControl(QtWidgets.QMainWindow):
 
     def discharge_remote(self):
         if self.ui_main.check_remote_discharge.isChecked():
-            self.discharge.set_mode_remote()
+            self._send_command("discharge", "mode", self.discharge.set_mode_remote)
             print('DISCHARGE: SYSTEM:REMOTE')
             self.ui_main.check_local_discharge.setDisabled(False)
             self.ui_main.check_local_discharge.setChecked(False)
@@ -781,13 +1155,13 @@ class PLMControl(QtWidgets.QMainWindow):
         if self.ui_main.discharge_start.isChecked():
             self.ui_main.discharge_stop.setChecked(False)
             self.ui_main.discharge_start.setDisabled(True)
-            self.discharge.set_output_on()
+            self._send_command("discharge", "output", self.discharge.set_output_on)
 
     def discharge_remote_stop(self):
         if self.ui_main.discharge_stop.isChecked():
             self.ui_main.discharge_start.setChecked(False)
             self.ui_main.discharge_start.setDisabled(False)
-            self.discharge.set_output_off()
+            self._send_command("discharge", "output", self.discharge.set_output_off)
 
     def solenoid_1_local(self):
         if self.ui_main.check_local_solenoid_1.isChecked():
@@ -819,17 +1193,17 @@ class PLMControl(QtWidgets.QMainWindow):
         if self.ui_main.solenoid_start_1.isChecked():
             self.ui_main.solenoid_stop_1.setChecked(False)
             self.ui_main.solenoid_start_1.setDisabled(True)
-            self.solenoid_1.set_output_on()
+            self._send_command("solenoid_1", "output", self.solenoid_1.set_output_on)
 
     def solenoid_1_remote_stop(self):
         if self.ui_main.solenoid_stop_1.isChecked():
             self.ui_main.solenoid_start_1.setChecked(False)
             self.ui_main.solenoid_start_1.setDisabled(False)
-            self.solenoid_1.set_output_off()
+            self._send_command("solenoid_1", "output", self.solenoid_1.set_output_off)
 
     def solenoid_2_local(self):
         if self.ui_main.check_local_solenoid_2.isChecked():
-            self.solenoid_2.set_mode_local()
+            self._send_command("solenoid_2", "mode", self.solenoid_2.set_mode_local)
             print('SOLENOID: SYSTEM:LOCAL')
             self.ui_main.check_remote_solenoid_2.setDisabled(False)
             self.ui_main.check_remote_solenoid_2.setChecked(False)
@@ -846,7 +1220,7 @@ class PLMControl(QtWidgets.QMainWindow):
     def solenoid_2_remote(self):
         if self.ui_main.check_remote_solenoid_2.isChecked():
             print('SOLENOID: SYSTEM:REMOTE')
-            self.solenoid_2.set_mode_remote()
+            self._send_command("solenoid_2", "mode", self.solenoid_2.set_mode_remote)
             self.ui_main.check_local_solenoid_2.setDisabled(False)
             self.ui_main.check_local_solenoid_2.setChecked(False)
             self.ui_main.check_remote_solenoid_2.setDisabled(True)
@@ -863,17 +1237,17 @@ class PLMControl(QtWidgets.QMainWindow):
         if self.ui_main.solenoid_start_2.isChecked():
             self.ui_main.solenoid_stop_2.setChecked(False)
             self.ui_main.solenoid_start_2.setDisabled(True)
-            self.solenoid_2.set_output_on()
+            self._send_command("solenoid_2", "output", self.solenoid_2.set_output_on)
 
     def solenoid_2_remote_stop(self):
         if self.ui_main.solenoid_stop_2.isChecked():
             self.ui_main.solenoid_start_2.setChecked(False)
             self.ui_main.solenoid_start_2.setDisabled(True)
-            self.solenoid_2.set_output_off()
+            self._send_command("solenoid_2", "output", self.solenoid_2.set_output_off)
 
     def cathode_local(self):
         if self.ui_main.check_local_cathode.isChecked():
-            self.cathode.set_mode_local()
+            self._send_command("cathode", "mode", self.cathode.set_mode_local)
             print('CATHODE: SYSTEM:LOCAL')
             self.ui_main.check_remote_cathode.setDisabled(False)
             self.ui_main.check_remote_cathode.setChecked(False)
@@ -889,7 +1263,7 @@ class PLMControl(QtWidgets.QMainWindow):
 
     def cathode_remote(self):
         if self.ui_main.check_remote_cathode.isChecked():
-            self.cathode.set_mode_remote()
+            self._send_command("cathode", "mode", self.cathode.set_mode_remote)
             print('CATHODE: SYSTEM:REMOTE')
             self.ui_main.check_local_cathode.setDisabled(False)
             self.ui_main.check_local_cathode.setChecked(False)
@@ -906,161 +1280,157 @@ class PLMControl(QtWidgets.QMainWindow):
     def cathode_remote_start(self):
         if self.ui_main.cathode_start.isChecked():
             self.ui_main.cathode_stop.setChecked(False)
-            self.cathode.set_output_on()
+            self._send_command("cathode", "output", self.cathode.set_output_on)
 
     def cathode_remote_stop(self):
         if self.ui_main.cathode_stop.isChecked():
             self.ui_main.cathode_start.setChecked(False)
-            self.cathode.set_output_off()
+            self._send_command("cathode", "output", self.cathode.set_output_off)
 
     def set_u_sample(self):
         self.u_sample = round(self.ui_main.set_u_sample.value(), 2)
         self.ui_main.set_u_sample_slider.setValue(self.u_sample)
-        self.sample.set_voltage(self.u_sample)
+        self._send_command("sample", "voltage", self.sample.set_voltage, self.u_sample)
 
     def set_u_sample_slider(self):
         self.u_sample = round(self.ui_main.set_u_sample_slider.value(), 2)
         self.ui_main.set_u_sample.setValue(self.u_sample)
-        self.sample.set_voltage(self.u_sample)
+        self._send_command("sample", "voltage", self.sample.set_voltage, self.u_sample)
 
     def set_i_sample(self):
         self.i_sample = round(self.ui_main.set_i_sample.value(), 2)
         self.ui_main.set_i_sample_slider.setValue(self.i_sample)
-        self.sample.set_current(self.i_sample)
+        self._send_command("sample", "current", self.sample.set_current, self.i_sample)
 
     def set_i_sample_slider(self):
         self.i_sample = round(self.ui_main.set_i_sample_slider.value(), 2)
         self.ui_main.set_i_sample.setValue(self.i_sample)
-        self.sample.set_current(self.i_sample)
+        self._send_command("sample", "current", self.sample.set_current, self.i_sample)
 
     def set_u_discharge(self):
         self.u_discharge = round(self.ui_main.set_u_discharge.value(), 2)
         self.ui_main.set_u_discharge_slider.setValue(self.u_discharge)
-        self.discharge.set_voltage(self.u_discharge)
+        self._send_command("discharge", "voltage", self.discharge.set_voltage, self.u_discharge)
 
     def set_u_discharge_slider(self):
         self.u_discharge = round(self.ui_main.set_u_discharge_slider.value(), 2)
         self.ui_main.set_u_discharge.setValue(self.u_discharge)
-        self.discharge.set_voltage(self.u_discharge)
+        self._send_command("discharge", "voltage", self.discharge.set_voltage, self.u_discharge)
 
     def set_i_discharge(self):
         self.i_discharge = round(self.ui_main.set_i_discharge.value(), 2)
         self.ui_main.set_i_discharge_slider.setValue(self.i_discharge)
-        self.discharge.set_current(self.i_discharge)
+        self._send_command("discharge", "current", self.discharge.set_current, self.i_discharge)
 
     def set_i_discharge_slider(self):
         self.i_discharge = round(self.ui_main.set_i_discharge_slider.value(), 2)
         self.ui_main.set_i_discharge.setValue(self.i_discharge)
-        self.discharge.set_current(self.i_discharge)
+        self._send_command("discharge", "current", self.discharge.set_current, self.i_discharge)
 
     def set_p_discharge(self):
         self.p_discharge = round(self.ui_main.set_p_discharge.value(), 2)
         self.ui_main.set_p_discharge_slider.setValue(self.p_discharge)
-        self.discharge.set_power(self.p_discharge)
+        self._send_command("discharge", "power", self.discharge.set_power, self.p_discharge)
 
     def set_p_discharge_slider(self):
         self.p_discharge = round(self.ui_main.set_p_discharge_slider.value(), 2)
         self.ui_main.set_p_discharge.setValue(self.p_discharge)
-        self.discharge.set_power(self.p_discharge)
+        self._send_command("discharge", "power", self.discharge.set_power, self.p_discharge)
 
     def set_u_solenoid_1(self):
         self.u_solenoid_1 = round(self.ui_main.set_u_solenoid_1.value(), 2)
         self.ui_main.set_u_solenoid_slider_1.setValue(self.u_solenoid_1)
-        self.solenoid_1.set_voltage(self.u_solenoid_1)
+        self._send_command("solenoid_1", "voltage", self.solenoid_1.set_voltage, self.u_solenoid_1)
 
     def set_u_solenoid_1_slider(self):
         self.u_solenoid_1 = round(self.ui_main.set_u_solenoid_slider_1.value(), 2)
         self.ui_main.set_u_solenoid_1.setValue(self.u_solenoid_1)
-        self.solenoid_1.set_voltage(self.u_solenoid_1)
+        self._send_command("solenoid_1", "voltage", self.solenoid_1.set_voltage, self.u_solenoid_1)
 
     def set_i_solenoid_1(self):
         self.i_solenoid_1 = round(self.ui_main.set_i_solenoid_1.value(), 2)
         self.ui_main.set_i_solenoid_slider_1.setValue(self.i_solenoid_1)
-        self.solenoid_1.set_current(self.i_solenoid_1)
+        self._send_command("solenoid_1", "current", self.solenoid_1.set_current, self.i_solenoid_1)
 
     def set_i_solenoid_slider_1(self):
         self.i_solenoid_1 = round(self.ui_main.set_i_solenoid_slider_1.value(), 2)
         self.ui_main.set_i_solenoid_1.setValue(self.i_solenoid_1)
-        self.solenoid_1.set_current(self.i_solenoid_1)
+        self._send_command("solenoid_1", "current", self.solenoid_1.set_current, self.i_solenoid_1)
 
     def set_u_solenoid_2(self):
         self.u_solenoid_2 = round(self.ui_main.set_u_solenoid_2.value(), 2)
         self.ui_main.set_u_solenoid_slider_2.setValue(self.u_solenoid_2)
-        self.solenoid_2.set_voltage(self.u_solenoid_2)
+        self._send_command("solenoid_2", "voltage", self.solenoid_2.set_voltage, self.u_solenoid_2)
 
     def set_u_solenoid_2_slider(self):
         self.u_solenoid_2 = round(self.ui_main.set_u_solenoid_slider_2.value(), 2)
         self.ui_main.set_u_solenoid_2.setValue(self.u_solenoid_2)
-        self.solenoid_2.set_voltage(self.u_solenoid_2)
+        self._send_command("solenoid_2", "voltage", self.solenoid_2.set_voltage, self.u_solenoid_2)
 
     def set_i_solenoid_2(self):
         self.i_solenoid_2 = round(self.ui_main.set_i_solenoid_2.value(), 2)
         self.ui_main.set_i_solenoid_slider_2.setValue(self.i_solenoid_2)
-        self.solenoid_2.set_current(self.i_solenoid_2)
+        self._send_command("solenoid_2", "current", self.solenoid_2.set_current, self.i_solenoid_2)
 
     def set_i_solenoid_slider_2(self):
         self.i_solenoid_2 = round(self.ui_main.set_i_solenoid_slider_2.value(), 2)
         self.ui_main.set_i_solenoid_2.setValue(self.i_solenoid_2)
-        self.solenoid_2.set_current(self.i_solenoid_2)
+        self._send_command("solenoid_2", "current", self.solenoid_2.set_current, self.i_solenoid_2)
     
     def set_p_solenoid_2(self):
         self.p_solenoid_2 = round(self.ui_main.set_p_solenoid_2.value(), 2)
         self.ui_main.set_p_solenoid_slider_2.setValue(self.p_solenoid_2)
-        self.solenoid_2.set_power(self.p_solenoid_2)
+        self._send_command("solenoid_2", "power", self.solenoid_2.set_power, self.p_solenoid_2)
     
     def set_p_solenoid_slider_2(self):
         self.p_solenoid_2 = round(self.ui_main.set_p_solenoid_slider_2.value(), 2)
         self.ui_main.set_i_solenoid_2.setValue(self.p_solenoid_2)
-        self.solenoid_2.set_power(self.p_solenoid_2)
+        self._send_command("solenoid_2", "power", self.solenoid_2.set_power, self.p_solenoid_2)
 
     def set_u_cathode(self):
         self.u_cathode = round(self.ui_main.set_u_cathode.value(), 2)
         self.ui_main.set_u_cathode_slider.setValue(self.u_cathode)
-        self.cathode.set_voltage(self.u_cathode)
+        self._send_command("cathode", "voltage", self.cathode.set_voltage, self.u_cathode)
 
     def set_u_cathode_slider(self):
         self.u_cathode = round(self.ui_main.set_u_cathode_slider.value(), 2)
         self.ui_main.set_u_cathode.setValue(self.u_cathode)
-        self.cathode.set_voltage(self.u_cathode)
+        self._send_command("cathode", "voltage", self.cathode.set_voltage, self.u_cathode)
 
     def set_i_cathode(self):
         self.i_cathode = round(self.ui_main.set_i_cathode.value(), 2)
         self.ui_main.set_i_cathode_slider.setValue(self.i_cathode)
-        self.cathode.set_current(self.i_cathode)
+        self._send_command("cathode", "current", self.cathode.set_current, self.i_cathode)
 
     def set_i_cathode_slider(self):
         self.i_cathode = round(self.ui_main.set_i_cathode_slider.value(), 2)
         self.ui_main.set_i_cathode.setValue(self.i_cathode)
-        self.cathode.set_current(self.i_cathode)
+        self._send_command("cathode", "current", self.cathode.set_current, self.i_cathode)
 
     def set_p_cathode(self):
         self.p_cathode = round(self.ui_main.set_p_cathode.value(), 2)
         self.ui_main.set_p_cathode_slider.setValue(self.p_cathode)
-        self.cathode.set_power(self.p_cathode)
+        self._send_command("cathode", "power", self.cathode.set_power, self.p_cathode)
 
     def set_p_cathode_slider(self):
         self.p_cathode = round(self.ui_main.set_p_cathode_slider.value(), 2)
         self.ui_main.set_p_cathode.setValue(self.p_cathode)
-        self.cathode.set_power(self.p_cathode)
+        self._send_command("cathode", "power", self.cathode.set_power, self.p_cathode)
 
     def set_rrg(self):
         self.gas = round(self.ui_main.set_rrg.value(), 2)
         self.ui_main.set_rrg_slider.setValue(self.gas)
-        self.rrg.set_flow(self.gas)
+        self._send_command("rrg", "flow", self.rrg.set_flow, self.gas)
 
     def set_rrg_slider(self):
         self.gas = round(self.ui_main.set_rrg_slider.value(), 2)
         self.ui_main.set_rrg.setValue(self.gas)
-        self.rrg.set_flow(self.gas)
-
-    def get_rrg_state(self):
-        state = self.rrg.get_state()
-        self.ui_main.set_rrg_state.setCurrentIndex(state)
+        self._send_command("rrg", "flow", self.rrg.set_flow, self.gas)
 
     def set_rrg_state(self):
         # 0 - открыт, 1 - закрыт, 2 - регулировка
         state = self.ui_main.set_rrg_state.currentIndex()
-        self.rrg.set_state(state)
+        self._send_command("rrg", "state", self.rrg.set_state, state)
         if state == 0:
             self.ui_main.set_rrg.setDisabled(False)
             self.ui_main.set_rrg_slider.setDisabled(False)
@@ -1072,16 +1442,19 @@ class PLMControl(QtWidgets.QMainWindow):
             self.ui_main.set_rrg_slider.setDisabled(True)
             self.ui_main.set_rrg.setValue(0)
             self.ui_main.set_rrg_slider.setValue(0)
-            self.rrg.set_flow(0)
+            self._send_command("rrg", "flow", self.rrg.set_flow, 0)
         if state == 2:
             self.ui_main.set_rrg.setDisabled(False)
             self.ui_main.set_rrg_slider.setDisabled(False)
     
     def set_gas(self):
+        # Команды выполняются в фоновом цикле событий, результат по каждому вакуумметру приходит сигналом command_result
         gas = self.ui_main.set_gas.currentText()
-        self.pressure_1.set_gas(gas)
-        self.pressure_2.set_gas(gas)
-        self.pressure_3.set_gas(gas)
+        names = ["pressure_1", "pressure_2", "pressure_3"]
+        AsyncLoopThread.get().submit(VacuumeterERSTEVAK.set_gas_many_async(
+            [self.pressure_1, self.pressure_2, self.pressure_3], gas,
+            callback=lambda index, ok: self.reading_worker.command_result.emit(names[index], "gas", gas, ok)
+        ))
 
     def closeEvent(self, event):
         msg = QtWidgets.QMessageBox()
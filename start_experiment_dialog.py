@@ -14,7 +14,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_Dialog(object):
     def setupUi(self, Dialog):
         Dialog.setObjectName("Dialog")
-        Dialog.resize(448, 414)
+        Dialog.resize(448, 470)
         self.verticalLayout = QtWidgets.QVBoxLayout(Dialog)
         self.verticalLayout.setObjectName("verticalLayout")
         self.groupBox = QtWidgets.QGroupBox(Dialog)
@@ -76,6 +76,14 @@ class Ui_Dialog(object):
         self.description.setObjectName("description")
         self.gridLayout_12.addWidget(self.description, 3, 2, 1, 1)
         self.verticalLayout.addWidget(self.groupBox)
+        self.init_status = QtWidgets.QLabel(Dialog)
+        self.init_status.setText("")
+        self.init_status.setObjectName("init_status")
+        self.verticalLayout.addWidget(self.init_status)
+        self.init_progress = QtWidgets.QProgressBar(Dialog)
+        self.init_progress.setProperty("value", 0)
+        self.init_progress.setObjectName("init_progress")
+        self.verticalLayout.addWidget(self.init_progress)
         self.OK_button = QtWidgets.QPushButton(Dialog)
         self.OK_button.setObjectName("OK_button")
         self.verticalLayout.addWidget(self.OK_button)